@@ -2,17 +2,22 @@ import numpy as np
 
 class ChemicalProcess:
 
-    def __init__(self,Frecycle_guess,Wrecycle_guess):
+    def __init__(self,Frecycle_guess,Wrecycle_guess,reactor_guess=None,flash_guess=None,reactor_type='GasPhaseReactor'):
         """
         Responsável por determinar a ordem em que os equipamentos são calculados, 
         chamar o calculo e passar adiante os outputs de equipamentos que são inputs de outros.
         Argumentos:
             Frecycle_guess (float): Pressão de equilibrio no tanque de flash.
             Wrecycle_guess (float): Vazão de entrada.
+            reactor_guess (list(float)): Chute inicial opcional do reator (composições + vazão de saída), 
+                tipicamente o estado de uma solução convergida anterior. Se None, usa o chute padrão.
+            flash_guess (float): Chute inicial opcional da fração vaporizada (beta) do flash. Se None, usa o chute padrão.
+            reactor_type (str): Modelo de reator: 'GasPhaseReactor' (CSTR) ou 'PlugFlowReactor' (tubular).
         Atributos:
             F (list(float)): Lista de vazões de cada corrente do sistema (a ser calculado).
             W (list(list(float))): Lista de composições de cada corrente do sistema (a ser calculado).
             residual (float): Resíduo da iteração considerando a diferença entre valores iniciais e finais dos atributos da corrente de riclo.
+            B (float): Fração vaporizada obtida no flash (a ser calculado).
         Métodos:
             calculate_mixer()
                 : Instancia um objeto misturador com os parâmetros de entrada do processo, 
@@ -24,7 +29,7 @@ class ChemicalProcess:
                 : Instancia um objeto ReactionRateConstant com os parâmetros de entrada do processo
                     e realiza os cálculos que define o valor das constantes reacionais a serem utilizadas no reator.
             calculate_reactor()
-                : Instancia um objeto reator com os parâmetros de entrada do processo,
+                : Instancia um objeto reator (do modelo reactor_type) com os parâmetros de entrada do processo,
                     realiza os cálculos e incorpora sua corrente de saida nos atributos F e W.
             get_LVequilibrium_constant()
                 : Instancia um objeto LiquidVaporEquilibriumConstant com os parâmetros de entrada do processo
@@ -38,12 +43,19 @@ class ChemicalProcess:
             evaluate()
                 : Chama todas as outras funções na ordem correta, organizando o passo a passo do processo.
                 Funciona como a chamada para o cálculo.
+            get_warm_start()
+                : Retorna os chutes iniciais (reciclo, reator e flash) correspondentes ao estado calculado,
+                    para reiniciar um novo cálculo a partir desta solução.
     """
         self.Frecycle_guess = Frecycle_guess
         self.Wrecycle_guess = Wrecycle_guess
+        self.reactor_guess = reactor_guess
+        self.flash_guess = flash_guess
+        self.reactor_type = reactor_type
         self.F =[None] * 7
         self.W =[None] * 7
         self.residual = None  
+        self.B = None
     
     def calculate_mixer(self,Fin,Win,Frecycle_guess,Wrecycle_guess):
         from entities.connections import Mixer
@@ -69,9 +81,17 @@ class ChemicalProcess:
         return reactionConstantSetter.Kr
 
     def calculate_reactor(self, Fin, Win, Vr, P, T, reactionCoefficients, Ko, E):
-        from entities.reactor import GasPhaseReactor
-        reactor=GasPhaseReactor(Fin, Win, Vr, self.get_reaction_constants(Ko,E,T), reactionCoefficients, P, T)
-        reactor.evaluate((0.45,0.15,0.3,0.1,Fin)) ##initial guess for linear system 
+        from entities.reactor import GasPhaseReactor, PlugFlowReactor
+        if self.reactor_type == 'PlugFlowReactor':
+            reactor=PlugFlowReactor(Fin, Win, Vr, self.get_reaction_constants(Ko,E,T), reactionCoefficients, P, T)
+        elif self.reactor_type == 'GasPhaseReactor':
+            reactor=GasPhaseReactor(Fin, Win, Vr, self.get_reaction_constants(Ko,E,T), reactionCoefficients, P, T)
+        else:
+            raise ValueError(f"Unknown reactor type {self.reactor_type}.")
+        if self.reactor_guess is None:
+            reactor.evaluate((0.45,0.15,0.3,0.1,Fin)) ##initial guess for linear system 
+        else:
+            reactor.evaluate(tuple(self.reactor_guess))
         self.F[2]=reactor.Fout
         self.W[2]=reactor.Wout
 
@@ -84,7 +104,11 @@ class ChemicalProcess:
     def calculate_flash(self, Fin, Win, Tf, elv_coefficients, P):
         from entities.flash import Flash
         flash=Flash(Fin, Win, self.get_LVequilibrium_constant(Tf, elv_coefficients), P)
-        flash.evaluate_flash_PT(0.6) ##initial guess for linear system 
+        if self.flash_guess is None:
+            flash.evaluate_flash_PT(0.6) ##initial guess for linear system 
+        else:
+            flash.evaluate_flash_PT(self.flash_guess)
+        self.B=flash.B
         self.F[3]=flash.L
         self.W[3]=flash.X
         self.F[4]=flash.V
@@ -110,4 +134,12 @@ class ChemicalProcess:
             for i in range(len(self.W[6])):
                 recycle_differences.append((self.W[6][i]-self.Wrecycle_guess[i])/((self.W[6][i]+self.Wrecycle_guess[i])/2))
             recycle_differences.append((self.F[6]-self.Frecycle_guess)/((self.F[6]+self.Frecycle_guess)/2))
-            self.residual = np.linalg.norm(recycle_differences)
\ No newline at end of file
+            self.residual = np.linalg.norm(recycle_differences)
+
+    def get_warm_start(self):
+        """
+            Extrai do estado calculado os chutes iniciais que permitem reiniciar o cálculo a partir desta solução.
+            Retorna:
+                (tuple) vazão de reciclo, composições de reciclo, chute do reator e chute do flash.
+        """
+        return self.F[6], list(self.W[6]), list(self.W[2])+[self.F[2]], self.B
\ No newline at end of file
@@ -1,5 +1,6 @@
 import numpy as np
 from scipy.optimize import fsolve, newton
+from entities import kernels
 
 class Flash: ##Faz o cálculo de flash para quando as condições de equilibrio e composição na entrada são conhecidas
     """
@@ -28,6 +29,7 @@ class Flash: ##Faz o cálculo de flash para quando as condições de equilibrio
         self.P = P
         self.Fin = Fin
         self.Z = z
+        self.Z_array = np.asarray(z,dtype=float)
         self.P_sat = p_sat
         self.K=list()
         self.V=None
@@ -38,19 +40,18 @@ class Flash: ##Faz o cálculo de flash para quando as condições de equilibrio
     def evaluate_K(self):
         for Pi_sat in self.P_sat:
             self.K.append(Pi_sat/self.P)
+        self.K_array=np.asarray(self.K,dtype=float)
                
     def formulate_equations_PT(self, x):
         """
             Formula a equação de Rashford-Rice a ser resolvida que vai ser passada para um solver do scipy.
+            O resíduo é calculado pela implementação de kernels selecionada (ver entities/kernels.py).
             Argumentos:
                 x (float): Chute inicial para o parâmetro beta a ser encontrado.
             Retorna:
                 Valor do resíduo da equação de Rashford-Rice a ser avaliado pelo solver do scipy .
         """
-        f=0.0
-        for i in range(len(self.Z)):
-            f=f+self.Z[i]*self.K[i]/(1+x*(self.K[i]-1))
-        return f-1
+        return kernels.get_backend().rachford_rice_residual(x, self.Z_array, self.K_array)
 
     def evaluate_flash_PT(self, x_in):
         """
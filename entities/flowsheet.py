@@ -0,0 +1,429 @@
+import itertools
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from entities.chemicalProcess import ChemicalProcess
+from entities import kernels
+
+class Flowsheet:
+    """
+        Monta e calcula um fluxograma declarado em configuração como um grafo de operações unitárias
+        (Mixer, GasPhaseReactor, PlugFlowReactor, Flash e Splitter, em qualquer quantidade).
+        O grafo é particionado em componentes fortemente conexas; em cada componente com reciclo é escolhido
+        automaticamente o menor conjunto de correntes de corte (tear streams), que são convergidas por substituição sucessiva.
+        As componentes são agrupadas em níveis de dependência: as de um mesmo nível não dependem umas das outras e são
+        calculadas em paralelo, em processos separados.
+        Argumentos:
+            flowsheet_configs (dict): Dicionário com as chaves 'units' e 'streams':
+                units: {nome: {'type': tipo, parâmetros...}}. Parâmetros numéricos são usados diretamente e
+                    parâmetros texto são lidos do input (ex.: "T": "Tr"). Pressões em bar.
+                streams: {nome: {'from': 'unidade.porta', 'to': 'unidade'}}. Correntes sem 'from' são alimentações
+                    e definem 'F' e 'W' (lista com um valor por componente). A porta pode ser omitida em unidades de saída única.
+                    Apenas o Mixer aceita mais de uma corrente de entrada; as demais unidades recebem exatamente uma.
+                max_workers (int): Número máximo de processos que calculam componentes em paralelo (opcional, 1 calcula tudo no próprio processo).
+            sys_configs (dict): Dicionário contendo configurações do processo de cálculo.
+            process_configs (dict): Dicionário contendo configurações do processo químico.
+        Atributos:
+            units (dict): Unidades do fluxograma.
+            streams (dict): Correntes do fluxograma, com origem (unidade, porta) e destino.
+            components (list(list(str))): Componentes fortemente conexas em ordem topológica.
+            levels (list(list(list(str)))): Componentes agrupadas em níveis; as componentes de um nível só dependem de níveis anteriores.
+            tear_streams (dict): Correntes de corte escolhidas para cada componente com reciclo.
+            F (dict(float)): Vazão de cada corrente (a ser calculado).
+            W (dict(list(float))): Composições de cada corrente (a ser calculado).
+            converged (bool): Indica se todas as correntes de corte convergiram.
+            component_workers (dict(int)): Processo (pid) que calculou cada componente na última chamada de evaluate().
+        Métodos:
+            get_successors(unit, ignored_streams)
+                : Retorna as unidades alimentadas pelas correntes de saída de uma unidade.
+            find_strongly_connected_components()
+                : Particiona o grafo em componentes fortemente conexas (algoritmo de Tarjan).
+            get_levels()
+                : Agrupa as componentes em níveis de dependência.
+            get_internal_streams(component)
+                : Retorna as correntes que ligam unidades de uma mesma componente.
+            get_evaluation_order(component, tear_streams)
+                : Ordena topologicamente as unidades de uma componente sem as correntes de corte.
+            select_tear_streams(component)
+                : Escolhe o menor conjunto de correntes de corte que torna a componente acíclica.
+            evaluate_unit(unit_name, input)
+                : Calcula uma unidade a partir das suas correntes de entrada.
+            get_tear_initial_guess(component, stream_name)
+                : Define o chute inicial de uma corrente de corte.
+            get_tear_residual(tear_streams, guesses)
+                : Calcula o resíduo das correntes de corte entre duas iterações.
+            evaluate_component(component, input)
+                : Calcula uma componente, convergindo suas correntes de corte quando houver.
+            evaluate(input)
+                : Calcula o fluxograma completo, nível a nível.
+            format_output()
+                : Monta o texto com a vazão e as composições de cada corrente.
+            write_output()
+                : Escreve o resultado do cálculo em um arquivo de texto.
+    """
+
+    unit_ports = {'Mixer': ['out'], 'GasPhaseReactor': ['out'], 'PlugFlowReactor': ['out'], 'Flash': ['liquid','vapor'], 'Splitter': ['recycle','purge']}
+
+    def __init__(self,flowsheet_configs,sys_configs,process_configs):
+        self.units = flowsheet_configs['units']
+        self.max_workers = flowsheet_configs.get('max_workers',4)
+        self.max_iterations = sys_configs['max_iterations']
+        self.convergence_threshold = sys_configs['convergence_threshold']
+        self.kernel_backend = kernels.set_backend(sys_configs.get('kernel_backend','auto'))
+        self.rec_stream_initial_guess = sys_configs['rec_stream_initial_guess']
+        self.rec_compositions_initial_guess = [sys_configs['rec_compositions_initial_guess']]*process_configs['N_components']
+        self.process_configs = process_configs
+        for unit_name, unit in self.units.items():
+            if unit.get('type') not in self.unit_ports:
+                raise ValueError(f"Unknown unit type {unit.get('type')} for unit {unit_name}.")
+        self.streams = dict()
+        self.inlets = {unit_name: [] for unit_name in self.units}
+        for stream_name, stream in flowsheet_configs['streams'].items():
+            source = None
+            if 'from' in stream:
+                unit_name, _, port = stream['from'].partition('.')
+                if unit_name not in self.units:
+                    raise ValueError(f"Stream {stream_name} comes from unknown unit {unit_name}.")
+                ports = self.unit_ports[self.units[unit_name]['type']]
+                if port == '':
+                    port = ports[0]
+                if port not in ports:
+                    raise ValueError(f"Unit {unit_name} has no outlet port {port}.")
+                source = (unit_name, port)
+            if stream.get('to') is not None:
+                if stream['to'] not in self.units:
+                    raise ValueError(f"Stream {stream_name} goes to unknown unit {stream['to']}.")
+                self.inlets[stream['to']].append(stream_name)
+            self.streams[stream_name] = dict(stream, source=source)
+        for unit_name, unit in self.units.items():
+            if unit['type'] == 'Mixer' and len(self.inlets[unit_name]) == 0:
+                raise ValueError(f"Mixer {unit_name} has no inlet streams.")
+            if unit['type'] != 'Mixer' and len(self.inlets[unit_name]) != 1:
+                raise ValueError(f"Unit {unit_name} ({unit['type']}) must have exactly one inlet stream, "
+                                 f"got {len(self.inlets[unit_name])}. Use a Mixer to combine streams.")
+        self.components = self.find_strongly_connected_components()
+        self.levels = self.get_levels()
+        self.tear_streams = dict()
+        for component in self.components:
+            if len(self.get_internal_streams(component)) > 0:
+                self.tear_streams[tuple(component)] = self.select_tear_streams(component)
+        self.reactor_guesses = dict()
+        self.flash_guesses = dict()
+        self.F = dict()
+        self.W = dict()
+        self.converged = None
+        self.component_workers = dict()
+
+    def get_successors(self,unit_name,ignored_streams=()):
+        successors = []
+        for stream_name, stream in self.streams.items():
+            if stream_name in ignored_streams or stream['source'] is None or stream.get('to') is None:
+                continue
+            if stream['source'][0] == unit_name:
+                successors.append(stream['to'])
+        return successors
+
+    def find_strongly_connected_components(self):
+        """
+            Particiona o grafo de unidades em componentes fortemente conexas usando o algoritmo de Tarjan.
+            Retorna:
+                (list(list(str))) componentes em ordem topológica (uma componente só depende das anteriores).
+        """
+        index = dict()
+        lowlink = dict()
+        stack = []
+        on_stack = set()
+        components = []
+
+        def connect(unit_name):
+            index[unit_name] = len(index)
+            lowlink[unit_name] = index[unit_name]
+            stack.append(unit_name)
+            on_stack.add(unit_name)
+            for successor in self.get_successors(unit_name):
+                if successor not in index:
+                    connect(successor)
+                    lowlink[unit_name] = min(lowlink[unit_name], lowlink[successor])
+                elif successor in on_stack:
+                    lowlink[unit_name] = min(lowlink[unit_name], index[successor])
+            if lowlink[unit_name] == index[unit_name]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == unit_name:
+                        break
+                components.append([name for name in self.units if name in component])
+
+        for unit_name in self.units:
+            if unit_name not in index:
+                connect(unit_name)
+        components.reverse()
+        return components
+
+    def get_levels(self):
+        """
+            Agrupa as componentes em níveis de dependência: o nível de uma componente é um a mais que o maior nível
+            das componentes que a alimentam.
+            Retorna:
+                (list(list(list(str)))) componentes de cada nível, em ordem topológica.
+        """
+        level = dict()
+        for component in self.components:
+            predecessors = [level[tuple(other)] for other in self.components if tuple(other) in level
+                            and any(successor in component for unit_name in other for successor in self.get_successors(unit_name))]
+            level[tuple(component)] = max(predecessors,default=-1)+1
+        return [[component for component in self.components if level[tuple(component)] == current_level]
+                for current_level in range(max(level.values(),default=-1)+1)]
+
+    def get_internal_streams(self,component):
+        return [stream_name for stream_name, stream in self.streams.items()
+                if stream['source'] is not None and stream['source'][0] in component and stream.get('to') in component]
+
+    def get_evaluation_order(self,component,tear_streams):
+        """
+            Ordena topologicamente as unidades de uma componente desconsiderando as correntes de corte.
+            Argumentos:
+                component (list(str)): Unidades da componente.
+                tear_streams (list(str)): Correntes de corte.
+            Retorna:
+                (list(str)) unidades em ordem de cálculo, ou None se ainda houver ciclo.
+        """
+        N_inlets = {unit_name: 0 for unit_name in component}
+        for stream_name in self.get_internal_streams(component):
+            if stream_name not in tear_streams:
+                N_inlets[self.streams[stream_name]['to']] += 1
+        ready = [unit_name for unit_name in component if N_inlets[unit_name] == 0]
+        order = []
+        while len(ready) > 0:
+            unit_name = ready.pop(0)
+            order.append(unit_name)
+            for successor in self.get_successors(unit_name,tear_streams):
+                if successor in N_inlets:
+                    N_inlets[successor] -= 1
+                    if N_inlets[successor] == 0:
+                        ready.append(successor)
+        if len(order) < len(component):
+            return None
+        return order
+
+    def select_tear_streams(self,component):
+        """
+            Escolhe o menor conjunto de correntes de corte que torna a componente acíclica, testando conjuntos de tamanho crescente.
+            Entre conjuntos de mesmo tamanho, prefere cortar correntes que chegam a unidades alimentadas de fora da componente,
+            para que o chute inicial nulo das correntes de corte não zere a vazão das demais unidades.
+            Argumentos:
+                component (list(str)): Unidades da componente.
+            Retorna:
+                (list(str)) correntes de corte.
+        """
+        internal_streams = self.get_internal_streams(component)
+        fed_units = [unit_name for unit_name in component
+                     if any(self.streams[stream_name]['source'] is None or self.streams[stream_name]['source'][0] not in component
+                            for stream_name in self.inlets[unit_name])]
+        for N_tears in range(1,len(internal_streams)+1):
+            candidates = [list(tear_streams) for tear_streams in itertools.combinations(internal_streams,N_tears)
+                          if self.get_evaluation_order(component,tear_streams) is not None]
+            if len(candidates) > 0:
+                return max(candidates, key=lambda tear_streams: sum(self.streams[stream_name]['to'] in fed_units for stream_name in tear_streams))
+        return internal_streams
+
+    def get_parameter(self,value,input):
+        if isinstance(value,str):
+            return input[value]
+        return value
+
+    def evaluate_unit(self,unit_name,input):
+        """
+            Calcula uma unidade a partir das suas correntes de entrada e atualiza as correntes de saída em F e W.
+            Argumentos:
+                unit_name (str): Nome da unidade.
+                input (dict): Input do processo, usado para resolver os parâmetros declarados como texto.
+        """
+        from entities.connections import Mixer, Splitter
+        from entities.reactor import GasPhaseReactor, PlugFlowReactor
+        from entities.flash import Flash
+        unit = self.units[unit_name]
+        Fin = [self.F[stream_name] for stream_name in self.inlets[unit_name]]
+        Win = [self.W[stream_name] for stream_name in self.inlets[unit_name]]
+        if unit['type'] == 'Mixer':
+            mixer = Mixer(Fin,Win)
+            mixer.evaluate()
+            outlets = {'out': (mixer.Fout, mixer.Wout)}
+        elif unit['type'] == 'GasPhaseReactor':
+            T = self.get_parameter(unit['T'],input)
+            Kr = ChemicalProcess.get_reaction_constants(self.process_configs['Kor'],self.process_configs['Ea'],T)
+            reactor = GasPhaseReactor(Fin[0], Win[0], self.get_parameter(unit.get('Vr',self.process_configs['Vr']),input), Kr,
+                                      self.process_configs['reaction_coefficients'], self.get_parameter(unit['P'],input)*(10**5), T)
+            reactor.evaluate(self.reactor_guesses.get(unit_name,(0.45,0.15,0.3,0.1,Fin[0])))
+            self.reactor_guesses[unit_name] = tuple(reactor.Wout)+(reactor.Fout,)
+            outlets = {'out': (reactor.Fout, reactor.Wout)}
+        elif unit['type'] == 'PlugFlowReactor':
+            T = self.get_parameter(unit['T'],input)
+            Kr = ChemicalProcess.get_reaction_constants(self.process_configs['Kor'],self.process_configs['Ea'],T)
+            reactor = PlugFlowReactor(Fin[0], Win[0], self.get_parameter(unit.get('Vr',self.process_configs['Vr']),input), Kr,
+                                      self.process_configs['reaction_coefficients'], self.get_parameter(unit['P'],input)*(10**5), T)
+            reactor.evaluate()
+            outlets = {'out': (reactor.Fout, reactor.Wout)}
+        elif unit['type'] == 'Flash':
+            P_sat = ChemicalProcess.get_LVequilibrium_constant(self.get_parameter(unit['T'],input),self.process_configs['elv_coefficients'])
+            flash = Flash(Fin[0], Win[0], P_sat, self.get_parameter(unit['P'],input)*(10**5))
+            flash.evaluate_flash_PT(self.flash_guesses.get(unit_name,0.6))
+            self.flash_guesses[unit_name] = flash.B
+            outlets = {'liquid': (flash.L, flash.X), 'vapor': (flash.V, flash.Y)}
+        elif unit['type'] == 'Splitter':
+            splitter = Splitter(Fin[0], Win[0], self.get_parameter(unit['Cs'],input))
+            splitter.evaluate()
+            outlets = {'recycle': (splitter.Fout['F_recycle'], splitter.Wout), 'purge': (splitter.Fout['F_purge'], splitter.Wout)}
+        for stream_name, stream in self.streams.items():
+            if stream['source'] is not None and stream['source'][0] == unit_name:
+                self.F[stream_name], self.W[stream_name] = outlets[stream['source'][1]]
+
+    def get_tear_initial_guess(self,component,stream_name):
+        """
+            Define o chute inicial de uma corrente de corte. Correntes que chegam a unidades alimentadas de fora da componente
+            usam o chute de reciclo das configurações de cálculo; as demais recebem a mistura das alimentações externas da componente,
+            para que as unidades seguintes não partam de vazão nula.
+            Argumentos:
+                component (list(str)): Unidades da componente.
+                stream_name (str): Corrente de corte.
+            Retorna:
+                (tuple) vazão e composições iniciais da corrente.
+        """
+        external_streams = [inlet for unit_name in component for inlet in self.inlets[unit_name]
+                            if self.streams[inlet]['source'] is None or self.streams[inlet]['source'][0] not in component]
+        if self.streams[stream_name]['to'] in [self.streams[inlet]['to'] for inlet in external_streams]:
+            return self.rec_stream_initial_guess, list(self.rec_compositions_initial_guess)
+        Fguess = sum(self.F[inlet] for inlet in external_streams)
+        if Fguess == 0.0:
+            return self.rec_stream_initial_guess, list(self.rec_compositions_initial_guess)
+        Wguess = [sum(self.F[inlet]*self.W[inlet][i] for inlet in external_streams)/Fguess
+                  for i in range(len(self.rec_compositions_initial_guess))]
+        return Fguess, Wguess
+
+    def get_tear_residual(self,tear_streams,guesses):
+        """
+            Calcula a norma das diferenças relativas entre os valores assumidos e calculados das correntes de corte,
+            como em ChemicalProcess.evaluate_residual().
+        """
+        differences = list()
+        for stream_name in tear_streams:
+            Fguess, Wguess = guesses[stream_name]
+            if self.F[stream_name] == 0.0:
+                continue
+            for i in range(len(self.W[stream_name])):
+                if self.W[stream_name][i]+Wguess[i] != 0.0:
+                    differences.append((self.W[stream_name][i]-Wguess[i])/((self.W[stream_name][i]+Wguess[i])/2))
+            differences.append((self.F[stream_name]-Fguess)/((self.F[stream_name]+Fguess)/2))
+        if len(differences) == 0:
+            return 0.0
+        return np.linalg.norm(differences)
+
+    def evaluate_component(self,component,input):
+        """
+            Calcula uma componente. Componentes com reciclo são resolvidas por substituição sucessiva das correntes de corte.
+            Argumentos:
+                component (list(str)): Unidades da componente.
+                input (dict): Input do processo.
+            Retorna:
+                (bool) True se a componente convergiu.
+        """
+        tear_streams = self.tear_streams.get(tuple(component),[])
+        order = self.get_evaluation_order(component,tear_streams)
+        for stream_name in tear_streams:
+            self.F[stream_name], self.W[stream_name] = self.get_tear_initial_guess(component,stream_name)
+        N_iteration = 0
+        while self.max_iterations > N_iteration:
+            guesses = {stream_name: (self.F[stream_name], list(self.W[stream_name])) for stream_name in tear_streams}
+            for unit_name in order:
+                self.evaluate_unit(unit_name,input)
+            if len(tear_streams) == 0 or self.get_tear_residual(tear_streams,guesses) < self.convergence_threshold:
+                return True
+            N_iteration = N_iteration+1
+        return False
+
+    def evaluate(self,input):
+        """
+            Calcula o fluxograma completo, nível a nível. As componentes de um mesmo nível são independentes entre si e,
+            quando há mais de uma, cada uma é calculada em um processo do ProcessPoolExecutor (os cálculos das unidades são
+            em Python e não rodariam em paralelo em threads). Cada processo recebe uma cópia do fluxograma com as correntes
+            já calculadas e devolve as correntes e os chutes das suas unidades, que são incorporados ao final do nível.
+            Argumentos:
+                input (dict): Input do processo (mesmo formato do input.json).
+            Retorna:
+                (bool) True se todas as componentes convergiram.
+        """
+        for stream_name, stream in self.streams.items():
+            if stream['source'] is None:
+                self.F[stream_name] = self.get_parameter(stream['F'],input)
+                self.W[stream_name] = [self.get_parameter(wi,input) for wi in stream['W']]
+        self.converged = True
+        self.component_workers = dict()
+        parallel = self.max_workers > 1 and any(len(components) > 1 for components in self.levels)
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if parallel else None
+        try:
+            for components in self.levels:
+                if executor is None or len(components) == 1:
+                    results = [evaluate_component_in_worker(self,component,input) for component in components]
+                else:
+                    results = list(executor.map(evaluate_component_in_worker,[self]*len(components),components,[input]*len(components)))
+                for component, (converged, worker, F, W, reactor_guesses, flash_guesses) in zip(components,results):
+                    self.F.update(F)
+                    self.W.update(W)
+                    self.reactor_guesses.update(reactor_guesses)
+                    self.flash_guesses.update(flash_guesses)
+                    self.component_workers[tuple(component)] = worker
+                    self.converged = converged and self.converged
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.converged
+
+    def format_output(self):
+        """
+            Monta o texto com a vazão e as composições de cada corrente, formatadas com 3 casas decimais.
+            Retorna:
+                (str) texto do arquivo de saída.
+        """
+        output_text = "RESULTADOS ENCONTRADOS \n########################################## \n"
+        for stream_name in self.streams:
+            compositions = ", ".join(str(round(wi,3)) for wi in self.W[stream_name])
+            output_text = output_text + f"{stream_name}: F = {round(self.F[stream_name],3)}, X = [{compositions}]\n"
+        return output_text
+
+    def write_output(self,path="output.txt"):
+        """
+            Escreve o resultado do cálculo em um arquivo de texto, ou um aviso caso o cálculo não tenha convergido.
+            Argumentos:
+                path (str): Caminho do arquivo de saída.
+        """
+        f = open(path, "w")
+        if not self.converged:
+            f.write("Calculation did not converge.")
+        else:
+            f.write(self.format_output())
+        f.close()
+
+
+def evaluate_component_in_worker(flowsheet,component,input):
+    """
+        Calcula uma componente do fluxograma. Usada por Flowsheet.evaluate(), tanto no próprio processo quanto nos
+        processos do ProcessPoolExecutor (onde flowsheet é uma cópia).
+        Argumentos:
+            flowsheet (Flowsheet): Fluxograma com as correntes que alimentam a componente já calculadas.
+            component (list(str)): Unidades da componente.
+            input (dict): Input do processo.
+        Retorna:
+            (tuple) convergência, pid do processo, vazões e composições das correntes que saem das unidades da componente,
+                e chutes do reator e do flash dessas unidades.
+    """
+    kernels.set_backend(flowsheet.kernel_backend)
+    converged = flowsheet.evaluate_component(component,input)
+    outlets = [stream_name for stream_name, stream in flowsheet.streams.items()
+               if stream['source'] is not None and stream['source'][0] in component]
+    return (converged, os.getpid(),
+            {stream_name: flowsheet.F[stream_name] for stream_name in outlets},
+            {stream_name: flowsheet.W[stream_name] for stream_name in outlets},
+            {unit_name: guess for unit_name, guess in flowsheet.reactor_guesses.items() if unit_name in component},
+            {unit_name: guess for unit_name, guess in flowsheet.flash_guesses.items() if unit_name in component})
@@ -0,0 +1,245 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+class NumpyKernels:
+    """
+        Implementação em NumPy dos cálculos mais internos do reator e do flash.
+        Métodos:
+            reaction_rates(W, P, Kr, ReacCoefs)
+                : Calcula a taxa global de reação de cada componente.
+            batch_reaction_rates(W, P, Kr, ReacCoefs)
+                : Calcula as taxas globais de reação para várias composições de uma vez.
+            batch_reaction_rates_jacobian(W, P, Kr, ReacCoefs)
+                : Calcula a derivada analítica das taxas globais em relação às composições, para várias composições de uma vez.
+            reactor_residual(x, Fin, Win, Vr, P, Kr, ReacCoefs)
+                : Calcula os resíduos do sistema de equações do reator.
+            rachford_rice_residual(beta, Z, K)
+                : Calcula o resíduo da equação de Rachford-Rice.
+    """
+
+    name = 'numpy'
+
+    @staticmethod
+    def reaction_rates(W, P, Kr, ReacCoefs):
+        """
+            Calcula a taxa global de reação de cada componente, como ReactionModel.get_global_reaction_rate().
+            Argumentos:
+                W (numpy(float)): Composições da fase gasosa.
+                P (float): Pressão no reator.
+                Kr (numpy(float)): Matriz (reações x 2) com os pares (k_direta,k_reversa).
+                ReacCoefs (numpy(float)): Matriz (reações x componentes) com os coeficientes reacionais.
+            Retorna:
+                (numpy(float)) taxa global de reação de cada componente.
+        """
+        Pi = W*P
+        rdir = Kr[:,0]*np.prod(Pi**np.where(ReacCoefs < 0, -ReacCoefs, 0.0), axis=1)
+        rinv = Kr[:,1]*np.prod(Pi**np.where(ReacCoefs > 0, ReacCoefs, 0.0), axis=1)
+        return ((rdir-rinv)/np.abs(ReacCoefs[:,0]))@ReacCoefs
+
+    @staticmethod
+    def batch_reaction_rates(W, P, Kr, ReacCoefs):
+        """
+            Calcula as taxas globais de reação para várias composições de uma vez.
+            Argumentos:
+                W (numpy(float)): Matriz (casos x componentes) de composições.
+            Retorna:
+                (numpy(float)) matriz (casos x componentes) com as taxas globais.
+        """
+        Pi = (W*P)[:,None,:]
+        rdir = Kr[:,0]*np.prod(Pi**np.where(ReacCoefs < 0, -ReacCoefs, 0.0), axis=2)
+        rinv = Kr[:,1]*np.prod(Pi**np.where(ReacCoefs > 0, ReacCoefs, 0.0), axis=2)
+        return ((rdir-rinv)/np.abs(ReacCoefs[:,0]))@ReacCoefs
+
+    @staticmethod
+    def batch_reaction_rates_jacobian(W, P, Kr, ReacCoefs):
+        """
+            Calcula a derivada analítica das taxas globais de reação em relação às composições.
+            Argumentos:
+                W (numpy(float)): Matriz (casos x componentes) de composições.
+            Retorna:
+                (numpy(float)) tensor (casos x componentes x componentes) com d(taxa_i)/d(W_m).
+        """
+        Pi = (W*P)[:,None,:]
+        Jacobian = np.zeros((W.shape[0],W.shape[1],W.shape[1]))
+        for exponents, k, sign in [(np.where(ReacCoefs < 0, -ReacCoefs, 0.0), Kr[:,0], 1.0),
+                                   (np.where(ReacCoefs > 0, ReacCoefs, 0.0), Kr[:,1], -1.0)]:
+            terms = Pi**exponents
+            for m in range(W.shape[1]):
+                derivative_terms = terms.copy()
+                derivative_terms[:,:,m] = exponents[:,m]*P*Pi[:,:,m]**np.maximum(exponents[:,m]-1, 0.0)
+                drate = sign*k*np.prod(derivative_terms, axis=2)
+                Jacobian[:,:,m] = Jacobian[:,:,m]+(drate/np.abs(ReacCoefs[:,0]))@ReacCoefs
+        return Jacobian
+
+    @staticmethod
+    def reactor_residual(x, Fin, Win, Vr, P, Kr, ReacCoefs):
+        """
+            Calcula os resíduos do sistema de equações do reator, como GasPhaseReactor.formulate_equations().
+            Argumentos:
+                x (numpy(float)): Composições e vazão de saída (última posição) em avaliação.
+            Retorna:
+                (numpy(float)) resíduo de cada equação do sistema.
+        """
+        W = x[:-1]
+        Fout = x[-1]
+        rates = NumpyKernels.reaction_rates(W, P, Kr, ReacCoefs)
+        f = np.empty(len(x))
+        f[:-1] = Fin*Win/Fout+rates*(Vr/Fout)-W
+        f[-1] = Fin-Fout+Vr*np.sum(rates)
+        return f
+
+    @staticmethod
+    def rachford_rice_residual(beta, Z, K):
+        """
+            Calcula o resíduo da equação de Rachford-Rice, como Flash.formulate_equations_PT().
+            Argumentos:
+                beta (float): Fração vaporizada em avaliação.
+                Z (numpy(float)): Composições de entrada.
+                K (numpy(float)): Constantes de equilíbrio líquido/vapor.
+            Retorna:
+                (float) resíduo da equação.
+        """
+        return np.sum(Z*K/(1+beta*(K-1)))-1
+
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def numba_reaction_rates(W, P, Kr, ReacCoefs):
+        N_reactions, N_components = ReacCoefs.shape
+        rates = np.zeros(N_components)
+        for j in range(N_reactions):
+            rdir = Kr[j,0]
+            rinv = Kr[j,1]
+            for i in range(N_components):
+                if ReacCoefs[j,i] < 0:
+                    rdir = rdir*(W[i]*P)**(-ReacCoefs[j,i])
+                elif ReacCoefs[j,i] > 0:
+                    rinv = rinv*(W[i]*P)**ReacCoefs[j,i]
+            rj = (rdir-rinv)/abs(ReacCoefs[j,0])
+            for i in range(N_components):
+                rates[i] = rates[i]+rj*ReacCoefs[j,i]
+        return rates
+
+    @numba.njit(cache=True)
+    def numba_batch_reaction_rates(W, P, Kr, ReacCoefs):
+        rates = np.empty(W.shape)
+        for c in range(W.shape[0]):
+            rates[c,:] = numba_reaction_rates(W[c,:], P, Kr, ReacCoefs)
+        return rates
+
+    @numba.njit(cache=True)
+    def numba_batch_reaction_rates_jacobian(W, P, Kr, ReacCoefs):
+        N_reactions, N_components = ReacCoefs.shape
+        Jacobian = np.zeros((W.shape[0], N_components, N_components))
+        for c in range(W.shape[0]):
+            for j in range(N_reactions):
+                scale = 1.0/abs(ReacCoefs[j,0])
+                for m in range(N_components):
+                    if ReacCoefs[j,m] == 0:
+                        continue
+                    exponent = abs(ReacCoefs[j,m])
+                    drate = exponent*P*(W[c,m]*P)**(exponent-1)
+                    if ReacCoefs[j,m] < 0:
+                        drate = drate*Kr[j,0]
+                    else:
+                        drate = -drate*Kr[j,1]
+                    for k in range(N_components):
+                        if k != m and ReacCoefs[j,k]*ReacCoefs[j,m] > 0:
+                            drate = drate*(W[c,k]*P)**abs(ReacCoefs[j,k])
+                    for i in range(N_components):
+                        Jacobian[c,i,m] = Jacobian[c,i,m]+drate*scale*ReacCoefs[j,i]
+        return Jacobian
+
+    @numba.njit(cache=True)
+    def numba_reactor_residual(x, Fin, Win, Vr, P, Kr, ReacCoefs):
+        N_components = len(Win)
+        rates = numba_reaction_rates(x[:N_components], P, Kr, ReacCoefs)
+        Fout = x[N_components]
+        f = np.empty(N_components+1)
+        RateTotal = 0.0
+        for i in range(N_components):
+            f[i] = Fin*Win[i]/Fout+rates[i]*(Vr/Fout)-x[i]
+            RateTotal = RateTotal+rates[i]
+        f[N_components] = Fin-Fout+Vr*RateTotal
+        return f
+
+    @numba.njit(cache=True)
+    def numba_rachford_rice_residual(beta, Z, K):
+        f = 0.0
+        for i in range(len(Z)):
+            f = f+Z[i]*K[i]/(1+beta*(K[i]-1))
+        return f-1
+
+
+class NumbaKernels:
+    """
+        Implementação compilada com Numba dos mesmos cálculos de NumpyKernels.
+        Os kernels são compilados com cache em disco (__pycache__), de modo que a compilação só é paga na primeira execução.
+    """
+
+    name = 'numba'
+
+    @staticmethod
+    def reaction_rates(W, P, Kr, ReacCoefs):
+        return numba_reaction_rates(W, float(P), Kr, ReacCoefs)
+
+    @staticmethod
+    def batch_reaction_rates(W, P, Kr, ReacCoefs):
+        return numba_batch_reaction_rates(W, float(P), Kr, ReacCoefs)
+
+    @staticmethod
+    def batch_reaction_rates_jacobian(W, P, Kr, ReacCoefs):
+        return numba_batch_reaction_rates_jacobian(W, float(P), Kr, ReacCoefs)
+
+    @staticmethod
+    def reactor_residual(x, Fin, Win, Vr, P, Kr, ReacCoefs):
+        return numba_reactor_residual(x, float(Fin), Win, float(Vr), float(P), Kr, ReacCoefs)
+
+    @staticmethod
+    def rachford_rice_residual(beta, Z, K):
+        return numba_rachford_rice_residual(float(beta), Z, K)
+
+    @staticmethod
+    def warm_up():
+        """
+            Chama cada kernel uma vez, carregando do cache (ou compilando) antes do primeiro cálculo de processo.
+        """
+        W = np.array([0.5,0.5])
+        Kr = np.array([[1.0,1.0]])
+        ReacCoefs = np.array([[-1.0,1.0]])
+        NumbaKernels.reactor_residual(np.array([0.5,0.5,1.0]), 1.0, W, 1.0, 1.0, Kr, ReacCoefs)
+        NumbaKernels.rachford_rice_residual(0.5, W, W)
+        NumbaKernels.batch_reaction_rates(W[None,:], 1.0, Kr, ReacCoefs)
+        NumbaKernels.batch_reaction_rates_jacobian(W[None,:], 1.0, Kr, ReacCoefs)
+
+
+backend = NumpyKernels
+
+def set_backend(name='auto'):
+    """
+        Seleciona a implementação dos kernels usada pelo reator e pelo flash.
+        Argumentos:
+            name (str): 'numba', 'numpy' ou 'auto' (Numba quando estiver instalado, NumPy caso contrário).
+        Retorna:
+            (str) nome da implementação selecionada.
+    """
+    global backend
+    if name not in ['auto','numba','numpy']:
+        raise ValueError(f"Unknown kernel backend {name}.")
+    if name == 'numba' and numba is None:
+        raise ImportError("Kernel backend 'numba' requires numba to be installed.")
+    if name == 'numpy' or numba is None:
+        backend = NumpyKernels
+    else:
+        if backend is not NumbaKernels:
+            NumbaKernels.warm_up()
+        backend = NumbaKernels
+    return backend.name
+
+def get_backend():
+    return backend
@@ -1,5 +1,8 @@
 import numpy as np
 from scipy.optimize import fsolve, newton
+from scipy.integrate import solve_ivp
+from scipy.sparse import block_diag
+from entities import kernels
         
 class GasPhaseReactor:      
     """
@@ -32,31 +35,22 @@ class GasPhaseReactor:
             self.T=T
             self.Fout=None
             self.Wout=[None]*len(Win)
+            self.Win_array=np.asarray(Win,dtype=float)
+            self.Kr_array=np.asarray(Kr,dtype=float)
+            self.ReacCoefs_array=np.asarray(ReacCoefs,dtype=float)
             
     def formulate_equations(self,initial_guess):
         """
             Formula o sistema de equações a ser resolvido.
+            As taxas e os resíduos são calculados pela implementação de kernels selecionada (ver entities/kernels.py),
+            equivalente ao cálculo de ReactionModel.
             Argumentos:
                 initial_guess (list(float)): Chute inicial para as vazões e composições a serem calculados.
             Retorna:
-                 f (list(float)): Valor do resíduo de cada equação do sistema. Será avaliado pelo solver do scipy .
-        """
-        W_initial=list()
-        for i in range(len(self.Win)):
-            W_initial.append(initial_guess[i])
-        self.Fout=initial_guess[-1]
-        f=list()
-        RateTotal = 0.0
-        for i in range(len(W_initial)):  
-            reactionModel=ReactionModel(self.Kr,self.ReacCoefs,self.P,i,W_initial)
-            RateBySpecies=reactionModel.get_global_reaction_rate()
-            fx=(self.Fin*self.Win[i]/self.Fout)+RateBySpecies*(self.Vr/self.Fout)-W_initial[i]
-            f.append(fx)
-            RateTotal = RateTotal + RateBySpecies
-        fx=(self.Fin-self.Fout+self.Vr*RateTotal)
-        f.append(fx)
-        print()
-        return tuple(f)
+                 f (numpy(float)): Valor do resíduo de cada equação do sistema. Será avaliado pelo solver do scipy .
+        """
+        return kernels.get_backend().reactor_residual(np.asarray(initial_guess,dtype=float), self.Fin, self.Win_array,
+                                                      self.Vr, self.P, self.Kr_array, self.ReacCoefs_array)
             
     def evaluate(self,initial_guess):
         """
@@ -73,6 +67,111 @@ class GasPhaseReactor:
         self.Fout=aux[-1]
 
 
+
+class PlugFlowReactor:
+    """
+        Responsável por realizar os cálculos referentes a um reator tubular (plug-flow) em fase gasosa.
+        Integra as equações diferenciais das vazões molares de cada componente ao longo do volume do reator (dFi/dV = ri)
+        com um integrador implícito adaptativo (BDF) e Jacobiano analítico das taxas.
+        Pode integrar várias condições de alimentação de uma vez, como um único sistema de equações.
+        Argumentos:
+            Fin (float): Vazão de entrada.
+            Win (list(float)): Composições de entrada.
+            Vr (float): Volume do reator.
+            Kr (list(list((float))): Lista com os pares (k_direta,k_reversa) de constantes reacionais.
+            ReacCoefs (list(list(int))): Lista com os coeficientes reacionais para cada reação:
+                                        [[R1 Coeficientes],[R2 Coeficientes],...]
+            P (float): Pressão no reator.
+            T (float): Temperatura no reator.
+            rtol (float): Tolerância relativa do integrador.
+        Atributos:
+            Fout (float): Vazão da corrente de saída (a ser calculado).
+            Wout (list(float)): Composições da corrente de saída (a ser calculado).
+        Métodos:
+            formulate_equations()
+                : Formula as derivadas das vazões molares em relação ao volume.
+            formulate_jacobian()
+                : Formula o Jacobiano analítico das derivadas em relação às vazões molares.
+            evaluate_batch()
+                : Integra o reator para várias condições de alimentação de uma vez.
+            evaluate()
+                : Integra o reator para a alimentação Fin, Win e atualiza os valores da vazão e composições de saída.
+    """
+    def __init__(self, Fin, Win, Vr, Kr, ReacCoefs, P, T, rtol=1e-8):
+            self.Fin=Fin
+            self.Win=Win
+            self.Vr=Vr
+            self.Kr=Kr
+            self.ReacCoefs = ReacCoefs
+            self.P=P
+            self.T=T
+            self.rtol=rtol
+            self.Fout=None
+            self.Wout=[None]*len(Win)
+            self.Kr_array=np.asarray(Kr,dtype=float)
+            self.ReacCoefs_array=np.asarray(ReacCoefs,dtype=float)
+
+    def formulate_equations(self,V,y):
+        """
+            Formula as derivadas das vazões molares em relação ao volume para todas as alimentações empilhadas.
+            Argumentos:
+                V (float): Volume do reator na posição avaliada.
+                y (numpy(float)): Vazões molares de cada componente, empilhadas por alimentação.
+            Retorna:
+                (numpy(float)) derivadas dFi/dV, na mesma ordem de y.
+        """
+        F = y.reshape(-1,len(self.Win))
+        W = F/np.sum(F,axis=1)[:,None]
+        rates = kernels.get_backend().batch_reaction_rates(W, self.P, self.Kr_array, self.ReacCoefs_array)
+        return rates.ravel()
+
+    def formulate_jacobian(self,V,y):
+        """
+            Formula o Jacobiano analítico das derivadas em relação às vazões molares.
+            Como as alimentações são independentes, o Jacobiano é bloco-diagonal e é montado como matriz esparsa.
+            Argumentos:
+                V (float): Volume do reator na posição avaliada.
+                y (numpy(float)): Vazões molares de cada componente, empilhadas por alimentação.
+            Retorna:
+                (scipy.sparse) Jacobiano d(dFi/dV)/dFm.
+        """
+        F = y.reshape(-1,len(self.Win))
+        Ftotal = np.sum(F,axis=1)
+        W = F/Ftotal[:,None]
+        rates_jacobian = kernels.get_backend().batch_reaction_rates_jacobian(W, self.P, self.Kr_array, self.ReacCoefs_array)
+        ##dWk/dFm = (delta_km - Wk)/Ftotal
+        jacobian = (rates_jacobian-np.einsum('cik,ck->ci',rates_jacobian,W)[:,:,None])/Ftotal[:,None,None]
+        return block_diag(list(jacobian),format='csc')
+
+    def evaluate_batch(self,Fins,Wins):
+        """
+            Integra o reator para várias condições de alimentação como um único sistema de equações.
+            Argumentos:
+                Fins (list(float)): Vazões de entrada.
+                Wins (list(list(float))): Composições de entrada.
+            Retorna:
+                (tuple) vazões de saída (numpy(float)) e composições de saída (numpy(float), alimentações x componentes).
+        """
+        y0 = (np.asarray(Fins,dtype=float)[:,None]*np.asarray(Wins,dtype=float)).ravel()
+        solution = solve_ivp(self.formulate_equations, (0.0,self.Vr), y0, method='BDF', jac=self.formulate_jacobian,
+                             rtol=self.rtol, atol=self.rtol*np.max(np.abs(y0))*1e-3)
+        if not solution.success:
+            raise RuntimeError(f"Plug-flow reactor integration failed: {solution.message}")
+        F = solution.y[:,-1].reshape(-1,len(self.Win))
+        Fouts = np.sum(F,axis=1)
+        return Fouts, F/Fouts[:,None]
+
+    def evaluate(self,initial_guess=None):
+        """
+            Integra o reator para a alimentação Fin, Win e atualiza os atributos da corrente de saída.
+            Argumentos:
+                initial_guess: Ignorado; existe para que o reator possa substituir GasPhaseReactor em ChemicalProcess.
+        """
+        Fouts, Wouts = self.evaluate_batch([self.Fin],[self.Win])
+        self.Fout = Fouts[0]
+        for i in range(len(self.Wout)):
+            self.Wout[i]=Wouts[0][i]
+
 class ReactionModel:
     """
         Responsável por calcular a taxa reacional (r_i) para um determinado componente i.
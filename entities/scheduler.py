@@ -0,0 +1,344 @@
+import json
+import sqlite3
+import time
+import numpy as np
+from entities.simulation import Simulation
+
+class JobScheduler:
+    """
+        Fila persistente de casos de simulação para campanhas longas (varreduras, Monte Carlo, otimização).
+        A fila e os resultados são gravados num banco SQLite a cada caso concluído, de modo que a campanha
+        pode ser interrompida e retomada exatamente de onde parou.
+        Argumentos:
+            db_path (str): Caminho do arquivo SQLite da campanha.
+            sys_configs (dict): Dicionário contendo configurações do processo de cálculo.
+            process_configs (dict): Dicionário contendo configurações do processo químico.
+        Atributos:
+            connection (sqlite3.Connection): Conexão com o banco da campanha.
+            input_ranges (dict): Faixas de cada variável de entrada, usadas para normalizar a distância entre casos.
+            coordinate_columns (list(str)): Colunas da tabela com as variáveis de entrada normalizadas de cada caso.
+            pending_ids, pending_priorities, pending_coordinates (numpy): Cópia em memória dos casos pendentes, usada para escolher o próximo caso.
+            done_ids, done_coordinates (numpy): Cópia em memória dos casos resolvidos, usada para buscar o chute inicial.
+            data_version (int): Versão do banco quando a cópia em memória foi carregada (None força recarregar).
+        Métodos:
+            add_cases(inputs, priority)
+                : Adiciona casos à fila.
+            validate_case(input)
+                : Verifica se um caso tem todas as variáveis de entrada necessárias.
+            cancel(case_ids)
+                : Cancela casos pendentes.
+            set_priority(case_ids, priority)
+                : Altera a prioridade de casos pendentes.
+            recover()
+                : Devolve à fila os casos que estavam em execução quando o processo foi interrompido.
+            get_coordinates(input)
+                : Normaliza as variáveis de entrada de um caso pelas suas faixas permitidas.
+            load_cases()
+                : Carrega os casos pendentes e resolvidos em memória, se o banco tiver sido alterado desde a última carga.
+            find_nearest(coordinates, point)
+                : Encontra a linha de coordenadas mais próxima de um ponto de operação.
+            next_case()
+                : Escolhe o próximo caso a calcular, priorizando o vizinho mais próximo do último caso resolvido.
+            get_warm_start(input)
+                : Busca, entre os casos já resolvidos, a solução mais próxima para usar como chute inicial.
+            run_case(case_id, input)
+                : Calcula um caso e grava seu resultado.
+            store_result(case_id, status, result)
+                : Grava o estado final e o resultado de um caso.
+            run(max_cases)
+                : Calcula os casos pendentes até esvaziar a fila (ou atingir max_cases).
+            status()
+                : Conta os casos em cada estado.
+            get_results()
+                : Retorna os casos concluídos com seus resultados.
+    """
+
+    input_ranges = {'Fo': (50,200), 'Xoa': (0,1), 'Xob': (0,1), 'Xoc': (0,1), 'Xod': (0,1),
+                    'Tr': (850,1250), 'Pr': (10,14), 'Tf': (300,700), 'Pf': (3,12), 'Cs': (0,0.8)}
+    coordinate_columns = [f"x_{key}" for key in input_ranges]
+
+    def __init__(self,db_path,sys_configs,process_configs):
+        self.sys_configs = sys_configs
+        self.process_configs = process_configs
+        self.last_input = None
+        self.data_version = None
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS cases (
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    priority INTEGER NOT NULL DEFAULT 0,
+                                    status TEXT NOT NULL DEFAULT 'pending',
+                                    input TEXT NOT NULL,
+                                    result TEXT,
+                                    created REAL NOT NULL,
+                                    finished REAL)""")
+        self.add_coordinate_columns()
+        self.connection.commit()
+
+    def add_coordinate_columns(self):
+        """
+            Cria as colunas com as variáveis de entrada normalizadas (ver get_coordinates()) e as preenche
+            para os casos de campanhas gravadas antes da existência dessas colunas.
+        """
+        existing_columns = [row[1] for row in self.connection.execute("PRAGMA table_info(cases)")]
+        missing_columns = [column for column in self.coordinate_columns if column not in existing_columns]
+        if len(missing_columns) == 0:
+            return
+        for column in missing_columns:
+            self.connection.execute(f"ALTER TABLE cases ADD COLUMN {column} REAL")
+        assignments = ", ".join(f"{column} = ?" for column in self.coordinate_columns)
+        for case_id, input in self.connection.execute("SELECT id, input FROM cases").fetchall():
+            self.connection.execute(f"UPDATE cases SET {assignments} WHERE id = ?",
+                                    self.get_coordinates(json.loads(input))+[case_id])
+
+    def close(self):
+        self.connection.close()
+
+    def add_cases(self,inputs,priority=0):
+        """
+            Adiciona casos à fila.
+            Argumentos:
+                inputs (list(dict)): Lista de inputs no mesmo formato do input.json.
+                priority (int): Prioridade dos casos. Casos de maior prioridade são calculados primeiro.
+            Retorna:
+                (list(int)) identificadores dos casos criados.
+            Levanta:
+                ValueError: se algum caso for inválido (ver validate_case()). Nesse caso nenhum caso é adicionado.
+        """
+        for input in inputs:
+            self.validate_case(input)
+        case_ids = []
+        columns = ", ".join(self.coordinate_columns)
+        placeholders = ", ".join("?" for column in self.coordinate_columns)
+        for input in inputs:
+            cursor = self.connection.execute(f"INSERT INTO cases (priority, input, created, {columns}) VALUES (?, ?, ?, {placeholders})",
+                                             [priority, json.dumps(input), time.time()]+self.get_coordinates(input))
+            case_ids.append(cursor.lastrowid)
+        self.connection.commit()
+        self.data_version = None
+        return case_ids
+
+    def validate_case(self,input):
+        """
+            Verifica se um caso tem todas as variáveis de entrada, com valores numéricos, antes de entrar na fila.
+            Argumentos:
+                input (dict): Input do caso.
+        """
+        if not isinstance(input,dict):
+            raise ValueError(f"Case {input!r} is not a JSON object.")
+        for key in self.input_ranges:
+            if key not in input:
+                raise ValueError(f"Case {input!r} is missing required input {key}.")
+            if isinstance(input[key],bool) or not isinstance(input[key],(int,float)):
+                raise ValueError(f"Case {input!r} has non-numeric input {key}.")
+
+    def cancel(self,case_ids):
+        """
+            Cancela casos pendentes. Casos já concluídos não são alterados.
+            Argumentos:
+                case_ids (list(int)): Identificadores dos casos.
+            Retorna:
+                (int) número de casos cancelados.
+        """
+        cancelled = 0
+        for case_id in case_ids:
+            cursor = self.connection.execute("UPDATE cases SET status = 'cancelled' WHERE id = ? AND status = 'pending'", (case_id,))
+            cancelled = cancelled + cursor.rowcount
+        self.connection.commit()
+        self.data_version = None
+        return cancelled
+
+    def set_priority(self,case_ids,priority):
+        """
+            Altera a prioridade de casos pendentes.
+            Argumentos:
+                case_ids (list(int)): Identificadores dos casos.
+                priority (int): Nova prioridade.
+            Retorna:
+                (int) número de casos alterados.
+        """
+        changed = 0
+        for case_id in case_ids:
+            cursor = self.connection.execute("UPDATE cases SET priority = ? WHERE id = ? AND status = 'pending'", (priority, case_id))
+            changed = changed + cursor.rowcount
+        self.connection.commit()
+        self.data_version = None
+        return changed
+
+    def recover(self):
+        """
+            Devolve à fila os casos que estavam em execução quando o processo foi interrompido.
+            Retorna:
+                (int) número de casos recuperados.
+        """
+        cursor = self.connection.execute("UPDATE cases SET status = 'pending' WHERE status = 'running'")
+        self.connection.commit()
+        self.data_version = None
+        return cursor.rowcount
+
+    def get_coordinates(self,input):
+        """
+            Normaliza cada variável de entrada pela sua faixa permitida, de modo que a distância euclidiana entre
+            as coordenadas de dois casos é a distância normalizada entre os pontos de operação.
+            Argumentos:
+                input (dict): Input do caso.
+            Retorna:
+                (list(float)) coordenadas na ordem de coordinate_columns.
+        """
+        return [(input[key]-low)/(high-low) for key, (low, high) in self.input_ranges.items()]
+
+    def load_cases(self):
+        """
+            Carrega em memória as coordenadas dos casos pendentes e resolvidos, lidas das colunas normalizadas (sem ler o JSON dos inputs).
+            A carga só é refeita quando o banco foi alterado por outra conexão (por exemplo, um cancelamento pela linha de comando
+            durante a execução) ou por add_cases(), cancel(), set_priority() e recover(). Os casos calculados por run_case()
+            atualizam a cópia em memória diretamente.
+        """
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self.data_version == data_version:
+            return
+        columns = ", ".join(self.coordinate_columns)
+        rows = self.connection.execute(f"SELECT id, priority, {columns} FROM cases WHERE status = 'pending' ORDER BY id").fetchall()
+        rows = np.array(rows, dtype=float).reshape(len(rows),len(self.coordinate_columns)+2)
+        self.pending_ids = rows[:,0].astype(int)
+        self.pending_priorities = rows[:,1]
+        self.pending_coordinates = rows[:,2:]
+        rows = self.connection.execute(f"SELECT id, {columns} FROM cases WHERE status = 'done' ORDER BY id").fetchall()
+        rows = np.array(rows, dtype=float).reshape(len(rows),len(self.coordinate_columns)+1)
+        self.done_ids = rows[:,0].astype(int)
+        self.done_coordinates = rows[:,1:]
+        self.data_version = data_version
+
+    @staticmethod
+    def find_nearest(coordinates,point):
+        """
+            Encontra a linha de coordenadas mais próxima do ponto informado. Em caso de empate, retorna a primeira (caso mais antigo).
+            Argumentos:
+                coordinates (numpy(float)): Matriz (casos x variáveis) de coordenadas normalizadas.
+                point (list(float)): Coordenadas normalizadas do ponto de operação.
+            Retorna:
+                (int) índice da linha mais próxima.
+        """
+        return int(np.argmin(np.sum((coordinates-np.array(point))**2, axis=1)))
+
+    def next_case(self):
+        """
+            Escolhe o próximo caso pendente. Entre os casos de maior prioridade, escolhe o mais próximo do último caso resolvido,
+            de forma que casos vizinhos sejam calculados em sequência e reaproveitem o chute inicial.
+            Retorna:
+                (tuple) identificador e input do caso, ou None se a fila estiver vazia.
+        """
+        self.load_cases()
+        if len(self.pending_ids) == 0:
+            return None
+        candidates = np.flatnonzero(self.pending_priorities == self.pending_priorities.max())
+        if self.last_input is not None:
+            candidates = candidates[[self.find_nearest(self.pending_coordinates[candidates],self.get_coordinates(self.last_input))]]
+        case_id = int(self.pending_ids[candidates[0]])
+        row = self.connection.execute("SELECT input FROM cases WHERE id = ?", (case_id,)).fetchone()
+        return case_id, json.loads(row[0])
+
+    def get_warm_start(self,input):
+        """
+            Busca, entre os casos já resolvidos, a solução mais próxima do ponto de operação informado.
+            Argumentos:
+                input (dict): Input do caso a ser calculado.
+            Retorna:
+                (dict) resultado do caso resolvido mais próximo, ou None se nenhum caso foi resolvido.
+        """
+        self.load_cases()
+        if len(self.done_ids) == 0:
+            return None
+        case_id = int(self.done_ids[self.find_nearest(self.done_coordinates,self.get_coordinates(input))])
+        row = self.connection.execute("SELECT result FROM cases WHERE id = ?", (case_id,)).fetchone()
+        return json.loads(row[0])
+
+    def run_case(self,case_id,input):
+        """
+            Calcula um caso, partindo da solução vizinha mais próxima, e grava o resultado no banco.
+            Se o cálculo partindo da solução vizinha falhar, ele é repetido a partir dos chutes padrão antes de o caso
+            ser marcado como 'failed' (ver Simulation.calculate_results()), de modo que o resultado não depende da ordem dos casos.
+            Argumentos:
+                case_id (int): Identificador do caso.
+                input (dict): Input do caso.
+            Retorna:
+                (str) estado final do caso ('done' ou 'failed'). Qualquer erro durante o cálculo marca o caso como 'failed'.
+        """
+        self.connection.execute("UPDATE cases SET status = 'running' WHERE id = ?", (case_id,))
+        self.connection.commit()
+        self.load_cases()
+        running = self.pending_ids != case_id
+        self.pending_ids = self.pending_ids[running]
+        self.pending_priorities = self.pending_priorities[running]
+        self.pending_coordinates = self.pending_coordinates[running]
+        try:
+            simulation = Simulation(input,self.sys_configs,self.process_configs)
+            if len(simulation.problem_inputs) > 0:
+                return self.store_result(case_id,'failed',{'warnings': simulation.problem_inputs})
+            warm_start = self.get_warm_start(input)
+            if warm_start is not None:
+                simulation.rec_stream_initial_guess = warm_start['F'][6]
+                simulation.rec_compositions_initial_guess = warm_start['W'][6]
+                simulation.reactor_initial_guess = warm_start['W'][2]+[warm_start['F'][2]]
+                simulation.flash_initial_guess = warm_start['B']
+            last_iteration = simulation.calculate_results()
+        except Exception as error:
+            return self.store_result(case_id,'failed',{'error': f"{type(error).__name__}: {error}"})
+        self.last_input = input
+        if last_iteration is None:
+            return self.store_result(case_id,'failed',{'error': "Calculation did not converge."})
+        result = {'F': [float(Fi) for Fi in last_iteration.F],
+                  'W': [[float(wi) for wi in Wi] for Wi in last_iteration.W],
+                  'B': float(last_iteration.B)}
+        return self.store_result(case_id,'done',result)
+
+    def store_result(self,case_id,status,result):
+        cursor = self.connection.execute("UPDATE cases SET status = ?, result = ?, finished = ? WHERE id = ? AND status = 'running'",
+                                         (status, json.dumps(result), time.time(), case_id))
+        self.connection.commit()
+        if status == 'done' and cursor.rowcount > 0 and self.data_version is not None:
+            columns = ", ".join(self.coordinate_columns)
+            coordinates = self.connection.execute(f"SELECT {columns} FROM cases WHERE id = ?", (case_id,)).fetchone()
+            self.done_ids = np.append(self.done_ids, case_id)
+            self.done_coordinates = np.vstack([self.done_coordinates, coordinates])
+        return status
+
+    def run(self,max_cases=None):
+        """
+            Calcula os casos pendentes, um de cada vez, gravando cada resultado assim que fica pronto.
+            Cancelamentos e mudanças de prioridade feitos durante a execução valem a partir do próximo caso.
+            Ao retomar uma campanha, a ordenação continua a partir do último caso concluído.
+            Argumentos:
+                max_cases (int): Número máximo de casos a calcular. None calcula até esvaziar a fila.
+            Retorna:
+                (int) número de casos calculados.
+        """
+        self.recover()
+        if self.last_input is None:
+            row = self.connection.execute("SELECT input FROM cases WHERE status = 'done' ORDER BY finished DESC LIMIT 1").fetchone()
+            if row is not None:
+                self.last_input = json.loads(row[0])
+        N_cases = 0
+        while max_cases is None or N_cases < max_cases:
+            case = self.next_case()
+            if case is None:
+                break
+            self.run_case(*case)
+            N_cases = N_cases+1
+        return N_cases
+
+    def status(self):
+        """
+            Conta os casos em cada estado.
+            Retorna:
+                (dict) número de casos por estado.
+        """
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM cases GROUP BY status").fetchall())
+
+    def get_results(self):
+        """
+            Retorna os casos concluídos com seus resultados.
+            Retorna:
+                (list(dict)) lista com 'id', 'input' e 'result' de cada caso concluído.
+        """
+        rows = self.connection.execute("SELECT id, input, result FROM cases WHERE status = 'done' ORDER BY id").fetchall()
+        return [{'id': case_id, 'input': json.loads(input), 'result': json.loads(result)} for case_id, input, result in rows]
@@ -1,4 +1,6 @@
+import time
 from entities.chemicalProcess import ChemicalProcess
+from entities import kernels
 
 class Simulation:
     """
@@ -13,8 +15,14 @@ class Simulation:
         Atributos:
         rec_stream_initial_guess = Chute inicial da vazão de reciclo (configuração de cálculo).
         rec_compositions_initial_guess = Chute inicial das composições de reciclo (configuração de cálculo).
+        default_rec_stream_guess = Chute inicial da vazão de reciclo das configurações, usado ao reiniciar o cálculo do zero.
+        default_rec_compositions_guess = Chute inicial das composições de reciclo das configurações, usado ao reiniciar o cálculo do zero.
+        reactor_initial_guess = Chute inicial do reator, atualizado a cada convergência (None usa o chute padrão).
+        flash_initial_guess = Chute inicial do flash, atualizado a cada convergência (None usa o chute padrão).
+        deadline_missed = Indica se o último cálculo foi interrompido por ultrapassar o prazo.
         self.max_iterations = Número máximo de iterações permitidas (configuração de cálculo).
         self.convergence_threshold = Critério limite de convergência (configuração de cálculo).
+        self.kernel_backend = Implementação dos kernels do reator e do flash em uso: 'numba' ou 'numpy' (configuração de cálculo).
         Fo = (float) Vazão de entrada (input).
         Win = (list(float)) Composições de entrada (input).
         Pr = (float) Pressão no reator (input).
@@ -27,13 +35,23 @@ class Simulation:
         Ea = list(list((float))) Energia de ativação (configuração de processo).
         reaction_coefficients list(list((float))) Coeficientes reacionais (configuração de processo).
         elv_coefficients = list(list((float))) Parâmetros dos modelos de equilibrio LV (configuração de processo).
+        reactor_type = (str) Modelo de reator, 'GasPhaseReactor' (CSTR) ou 'PlugFlowReactor' (configuração de processo).
         Métodos:
             bar_to_pascal()
                 : Converte pressões em bar (dado de entrada) para Pascal (usado no calculo).
+            set_inputs()
+                : Valida e atualiza os dados de entrada do processo.
             validate_inputs()
                 : Realiza a validação dos inputs, garantindo que eles estajam dentro das faixas permitdas.
-            calculate_results()
+            reset_initial_guesses()
+                : Restaura os chutes iniciais padrão (reciclo das configurações, reator e flash padrão).
+            get_initial_guesses() / set_initial_guesses()
+                : Lê e restaura o conjunto de chutes iniciais (reciclo, reator e flash).
+            iterate_process()
                 : Instancia os objetos ChemicalProcess e realiza os cálculos de processo de forma iterativa até a convergência.
+            calculate_results()
+                : Chama iterate_process() e, se o cálculo partindo de uma solução anterior falhar (exceto por prazo), repete uma vez com os chutes padrão.
+                    Aceita opcionalmente um prazo limite para o cálculo.
             write_warning()
                 : Escreve um arquivo com avisos de inputs incorretos. Utilizado com os dados de entrada do usuário não são apropriados.
             format_result_numbers()
@@ -51,31 +69,46 @@ class Simulation:
     """
 
     def __init__(self,input,sys_configs,process_configs):
-        self.problem_inputs = self.validate_inputs(input)
         ##Sys Configs
-        self.rec_stream_initial_guess = sys_configs['rec_stream_initial_guess']
-        self.rec_compositions_initial_guess = [sys_configs['rec_compositions_initial_guess']]*process_configs['N_components']
+        self.default_rec_stream_guess = sys_configs['rec_stream_initial_guess']
+        self.default_rec_compositions_guess = [sys_configs['rec_compositions_initial_guess']]*process_configs['N_components']
+        self.rec_stream_initial_guess = self.default_rec_stream_guess
+        self.rec_compositions_initial_guess = list(self.default_rec_compositions_guess)
         # self.rec_compositions_initial_guess = sys_configs['rec_compositions_initial_guess']
         self.max_iterations = sys_configs['max_iterations']
         self.convergence_threshold = sys_configs['convergence_threshold']
+        self.kernel_backend = kernels.set_backend(sys_configs.get('kernel_backend','auto'))
+        self.reactor_initial_guess = None
+        self.flash_initial_guess = None
+        self.deadline_missed = False
         ##Inputs
-        self.Fo = input['Fo']
-        self.Win = [input['Xoa'],input['Xob'],input['Xoc'],input['Xod']]
-        self.Pr = self.bar_to_pascal(input['Pr'])
-        self.Tr = input['Tr']
-        self.Pf = self.bar_to_pascal(input['Pf'])
-        self.Tf = input['Tf']
-        self.Cs = input['Cs']
+        self.set_inputs(input)
         ##Process Configs
         self.Vr = process_configs['Vr']
         self.Kor = process_configs['Kor']
         self.Ea = process_configs['Ea']
         self.reaction_coefficients = process_configs['reaction_coefficients']
         self.elv_coefficients = process_configs['elv_coefficients']
+        self.reactor_type = process_configs.get('reactor_type','GasPhaseReactor')
 
     def bar_to_pascal(self,P):
         return P*(10**5)
 
+    def set_inputs(self,input):
+        """
+            Valida e atualiza os dados de entrada do processo, preservando os chutes iniciais já obtidos.
+            Argumentos:
+                input (dict): Input com os dados de entrada do processo fornecidos pelo usuário.
+        """
+        self.problem_inputs = self.validate_inputs(input)
+        self.Fo = input['Fo']
+        self.Win = [input['Xoa'],input['Xob'],input['Xoc'],input['Xod']]
+        self.Pr = self.bar_to_pascal(input['Pr'])
+        self.Tr = input['Tr']
+        self.Pf = self.bar_to_pascal(input['Pf'])
+        self.Tf = input['Tf']
+        self.Cs = input['Cs']
+
     def validate_inputs(self,input):
         """
             Realiza a validação dos inputs, garantindo que eles estajam dentro das faixas permitdas.
@@ -98,21 +131,78 @@ class Simulation:
         if round(input['Xoa']+input['Xob']+input['Xoc']+input['Xod'],4) != 1.0000: problem_inputs.append("Molar ratios do not sum zero. Check compositions inserted.")
         return problem_inputs
 
-    def calculate_results(self):
+    def reset_initial_guesses(self):
+        self.rec_stream_initial_guess = self.default_rec_stream_guess
+        self.rec_compositions_initial_guess = list(self.default_rec_compositions_guess)
+        self.reactor_initial_guess = None
+        self.flash_initial_guess = None
+
+    def get_initial_guesses(self):
+        return (self.rec_stream_initial_guess, list(self.rec_compositions_initial_guess),
+                self.reactor_initial_guess, self.flash_initial_guess)
+
+    def set_initial_guesses(self,initial_guesses):
+        self.rec_stream_initial_guess, self.rec_compositions_initial_guess, \
+            self.reactor_initial_guess, self.flash_initial_guess = initial_guesses
+
+    def calculate_results(self,deadline=None):
+        """
+            Realiza o cálculo do processo partindo dos chutes iniciais atuais (tipicamente a última solução convergida).
+            Se houver chutes do reator ou do flash vindos de uma solução anterior e o cálculo falhar por erro do solver
+            ou falta de convergência, o cálculo é repetido uma vez a partir dos chutes padrão.
+            Se o prazo for ultrapassado não há nova tentativa. Sempre que o cálculo é interrompido ou falha, os chutes
+            da última solução convergida são restaurados, para que o próximo cálculo continue partindo dela.
+            Argumentos:
+                deadline (float): Instante limite (relógio time.monotonic) para o cálculo. None desativa o prazo.
+            Retorna:
+                Objeto com a iteração do processo que convergiu, ou None caso não ocorra convergência (ChemicalProcess)
+        """
+        converged_guesses = self.get_initial_guesses()
+        warm_started = self.reactor_initial_guess is not None or self.flash_initial_guess is not None
+        try:
+            last_iteration = self.iterate_process(deadline)
+            if last_iteration is not None or self.deadline_missed or not warm_started:
+                if last_iteration is None:
+                    self.set_initial_guesses(converged_guesses)
+                return last_iteration
+        except Exception:
+            if not warm_started:
+                self.set_initial_guesses(converged_guesses)
+                raise
+        self.reset_initial_guesses()
+        try:
+            last_iteration = self.iterate_process(deadline)
+        except Exception:
+            self.set_initial_guesses(converged_guesses)
+            raise
+        if last_iteration is None:
+            self.set_initial_guesses(converged_guesses)
+        return last_iteration
+
+    def iterate_process(self,deadline=None):
         """
             Instancia os objetos ChemicalProcess e realiza os cálculos de processo de forma iterativa até a convergência.
+            Ao convergir, guarda os chutes do reator e do flash para que o próximo cálculo parta desta solução.
             Argumentos:
+                deadline (float): Instante limite (relógio time.monotonic) para o cálculo. 
+                    O prazo é verificado entre iterações; se for ultrapassado o cálculo é interrompido. None desativa o prazo.
             Retorna:
                 Objeto com a iteração do processo que convergiu, ou None caso não ocorra convergência (ChemicalProcess)
         """
+        self.deadline_missed = False
         N_iteration=0
         while self.max_iterations > N_iteration:
-            simul = ChemicalProcess(self.rec_stream_initial_guess,self.rec_compositions_initial_guess)
+            if deadline is not None and time.monotonic() > deadline:
+                self.deadline_missed = True
+                return None
+            simul = ChemicalProcess(self.rec_stream_initial_guess,self.rec_compositions_initial_guess,
+                                    self.reactor_initial_guess,self.flash_initial_guess,self.reactor_type)
             simul.evaluate(self.Fo,self.Win,self.Vr,self.Pr,self.Tr,self.reaction_coefficients,self.Kor,self.Ea,
                             self.Pf,self.Tf,self.elv_coefficients,self.Cs)
             self.rec_stream_initial_guess = simul.F[6]
             self.rec_compositions_initial_guess = simul.W[6]
             if simul.residual < self.convergence_threshold:
+                _, _, self.reactor_initial_guess, self.flash_initial_guess = simul.get_warm_start()
                 return simul
             N_iteration = N_iteration+1
         return None
@@ -0,0 +1,202 @@
+import json
+import math
+import socket
+import sys
+import time
+from entities.simulation import Simulation
+
+class SoftSensor:
+    """
+        Executa o modelo em tempo real ao lado da planta, como um sensor virtual.
+        A cada medição recebida (tick) re-resolve o processo a partir do último estado convergido e publica
+        as vazões e composições estimadas das correntes F2 a F6 dentro de um prazo fixo.
+        Argumentos:
+            input (dict): Input inicial do processo (mesmo formato do input.json). Fornece os valores não medidos, como Cs.
+            sys_configs (dict): Dicionário contendo configurações do processo de cálculo.
+                A chave 'soft_sensor' define 'deadband' (variação relativa mínima das medições para recalcular)
+                e 'deadline' (prazo de cada tick em segundos).
+            process_configs (dict): Dicionário contendo configurações do processo químico.
+        Atributos:
+            simulation (Simulation): Simulação mantida entre os ticks, guarda os chutes iniciais da última convergência.
+            measured_keys (list(str)): Chaves do input que chegam pelo fluxo de medições.
+            deadband (float): Variação relativa mínima das medições para disparar um novo cálculo.
+            deadline (float): Prazo em segundos para cada tick.
+            last_inputs (dict): Medições usadas no último cálculo.
+            last_state (ChemicalProcess): Último estado convergido do processo.
+            stale (bool): Indica que a estimativa publicada não corresponde às últimas medições.
+        Métodos:
+            validate_measurements()
+                : Verifica se as medições recebidas são números finitos.
+            inputs_changed()
+                : Verifica se as medições variaram mais do que a banda morta.
+            process_tick()
+                : Atualiza as medições, re-resolve o processo se necessário e retorna a estimativa.
+            get_estimate()
+                : Monta o dicionário com a estimativa das correntes F2 a F6.
+            run()
+                : Consome um fluxo de medições e publica uma estimativa por tick.
+    """
+
+    measured_keys = ['Fo','Xoa','Xob','Xoc','Xod','Tr','Pr','Tf','Pf']
+
+    def __init__(self,input,sys_configs,process_configs):
+        self.input = dict(input)
+        self.simulation = Simulation(self.input,sys_configs,process_configs)
+        self.deadband = sys_configs['soft_sensor']['deadband']
+        self.deadline = sys_configs['soft_sensor']['deadline']
+        self.last_inputs = None
+        self.last_state = None
+        self.stale = True
+
+    def validate_measurements(self,measurements):
+        """
+            Verifica se as medições recebidas no tick são números finitos (rejeita null, NaN, infinito e textos).
+            Argumentos:
+                measurements (dict): Medições recebidas no tick.
+            Retorna:
+                (list(str)) avisos das medições inválidas.
+        """
+        if not isinstance(measurements,dict):
+            return ["Measurements must be a JSON object."]
+        problem_measurements = []
+        for key in self.measured_keys:
+            if key not in measurements:
+                continue
+            value = measurements[key]
+            if isinstance(value,bool) or not isinstance(value,(int,float)) or not math.isfinite(value):
+                problem_measurements.append(f"{key} measurement is not a finite number.")
+        return problem_measurements
+
+    def inputs_changed(self,measurements):
+        """
+            Verifica se alguma medição variou mais do que a banda morta em relação ao último cálculo.
+            Argumentos:
+                measurements (dict): Medições recebidas no tick.
+            Retorna:
+                (bool) True se o processo precisa ser recalculado.
+        """
+        if self.last_inputs is None or self.last_state is None:
+            return True
+        for key in self.measured_keys:
+            new_value = measurements.get(key,self.last_inputs[key])
+            old_value = self.last_inputs[key]
+            scale = max(abs(old_value),abs(new_value))
+            if scale > 0.0 and abs(new_value-old_value)/scale > self.deadband:
+                return True
+        return False
+
+    def process_tick(self,measurements):
+        """
+            Processa um tick: medições que não são números finitos são rejeitadas e a última estimativa é publicada como desatualizada;
+            ignora medições dentro da banda morta do último cálculo convergido (a estimativa publicada
+            volta a corresponder às medições e deixa de ser desatualizada), senão re-resolve o processo partindo do último estado convergido.
+            Se o cálculo partindo do último estado falhar, é repetido uma vez a partir dos chutes padrão (ver Simulation.calculate_results()).
+            Se o prazo não for cumprido (ou o cálculo não convergir ou gerar erro) a última estimativa é mantida e marcada como desatualizada.
+            Argumentos:
+                measurements (dict): Medições recebidas no tick (subconjunto das chaves em measured_keys).
+            Retorna:
+                (dict) estimativa publicada, ver get_estimate().
+        """
+        start = time.monotonic()
+        problem_measurements = self.validate_measurements(measurements)
+        if len(problem_measurements) > 0:
+            self.stale = True
+            return self.get_estimate(warnings=problem_measurements)
+        if not self.inputs_changed(measurements):
+            self.stale = False
+            return self.get_estimate(skipped=True)
+        new_input = dict(self.input)
+        for key in self.measured_keys:
+            if key in measurements:
+                new_input[key] = measurements[key]
+        self.simulation.set_inputs(new_input)
+        if len(self.simulation.problem_inputs) > 0:
+            self.stale = True
+            return self.get_estimate(warnings=self.simulation.problem_inputs)
+        try:
+            state = self.simulation.calculate_results(deadline=start+self.deadline)
+        except Exception:
+            state = None
+        if state is None:
+            self.stale = True
+            return self.get_estimate()
+        self.input = new_input
+        self.last_inputs = new_input
+        self.last_state = state
+        self.stale = time.monotonic()-start > self.deadline
+        return self.get_estimate()
+
+    def get_estimate(self,skipped=False,warnings=None):
+        """
+            Monta o dicionário com a estimativa das vazões e composições das correntes F2 a F6.
+            Argumentos:
+                skipped (bool): Indica que o tick foi ignorado por estar dentro da banda morta.
+                warnings (list(str)): Avisos de medições inválidas ou fora das faixas permitidas.
+            Retorna:
+                (dict) estimativa com as chaves 'time', 'stale', 'skipped', 'warnings' e 'F2'...'F6'.
+        """
+        estimate = {'time': time.time(), 'stale': self.stale, 'skipped': skipped, 'warnings': warnings or []}
+        for i in range(2,7):
+            if self.last_state is None:
+                estimate[f"F{i}"] = None
+            else:
+                estimate[f"F{i}"] = {'F': float(self.last_state.F[i]),
+                                     'X': [float(wi) for wi in self.last_state.W[i]]}
+        return estimate
+
+    def run(self,stream,publish=None):
+        """
+            Consome um fluxo de medições (uma linha JSON por tick) e publica uma estimativa por tick.
+            Linhas vazias ou inválidas são ignoradas.
+            Argumentos:
+                stream (iterable(str)): Fluxo de linhas, ver follow_file() e read_unix_socket().
+                publish (function): Função chamada com cada estimativa. Por padrão escreve uma linha JSON na saída padrão.
+        """
+        if publish is None:
+            publish = write_estimate
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                measurements = json.loads(line)
+            except ValueError:
+                continue
+            publish(self.process_tick(measurements))
+
+
+def write_estimate(estimate):
+    sys.stdout.write(json.dumps(estimate) + "\n")
+    sys.stdout.flush()
+
+def follow_file(path,poll_interval=0.1):
+    """
+        Acompanha um arquivo de medições (como 'tail -f'), retornando cada nova linha escrita nele.
+        Argumentos:
+            path (str): Caminho do arquivo de medições.
+            poll_interval (float): Intervalo em segundos entre verificações de novas linhas.
+    """
+    with open(path, "r") as f:
+        f.seek(0, 2)
+        buffer = ""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll_interval)
+                continue
+            buffer = buffer + chunk
+            if buffer.endswith("\n"):
+                yield buffer
+                buffer = ""
+
+def read_unix_socket(path):
+    """
+        Conecta a um socket Unix e retorna cada linha de medição recebida.
+        Argumentos:
+            path (str): Caminho do socket Unix.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        with client.makefile("r") as f:
+            for line in f:
+                yield line
@@ -0,0 +1,32 @@
+import sys
+import json
+from entities.simulation import Simulation
+from entities.flowsheet import Flowsheet
+
+##Uso: python flowsheet.py [arquivo_do_fluxograma]
+##     Por padrão usa ./configs/flowsheet_configs.json
+
+flowsheet_path = sys.argv[1] if len(sys.argv) > 1 else './configs/flowsheet_configs.json'
+
+with open('./configs/system_configs.json', 'r') as f:
+    sys_configs = json.load(f)
+
+with open('./configs/process_configs.json', 'r') as f:
+    process_configs = json.load(f)
+
+with open(flowsheet_path, 'r') as f:
+    flowsheet_configs = json.load(f)
+
+with open('input.json', 'r') as f:
+    input = json.load(f)
+
+
+simulation = Simulation(input,sys_configs,process_configs)
+if len(simulation.problem_inputs) > 0:
+    simulation.write_warning()
+else:
+    flowsheet = Flowsheet(flowsheet_configs,sys_configs,process_configs)
+    flowsheet.evaluate(input)
+    flowsheet.write_output()
+
+print('Programa executado com sucesso.')
@@ -0,0 +1,57 @@
+import argparse
+import json
+from entities.scheduler import JobScheduler
+
+##Uso: python scheduler.py add casos.json [--priority N]
+##     python scheduler.py run [--max-cases N]
+##     python scheduler.py status
+##     python scheduler.py cancel ID [ID ...]
+##     python scheduler.py priority N ID [ID ...]
+##     python scheduler.py export resultados.json
+
+parser = argparse.ArgumentParser(description='Fila persistente de casos de simulação.')
+parser.add_argument('--db', default='campaign.db', help='Arquivo SQLite da campanha.')
+commands = parser.add_subparsers(dest='command', required=True)
+add_command = commands.add_parser('add', help='Adiciona casos (lista JSON de inputs) à fila.')
+add_command.add_argument('cases_file')
+add_command.add_argument('--priority', type=int, default=0)
+run_command = commands.add_parser('run', help='Calcula os casos pendentes.')
+run_command.add_argument('--max-cases', type=int, default=None)
+commands.add_parser('status', help='Mostra quantos casos há em cada estado.')
+cancel_command = commands.add_parser('cancel', help='Cancela casos pendentes.')
+cancel_command.add_argument('case_ids', type=int, nargs='+')
+priority_command = commands.add_parser('priority', help='Altera a prioridade de casos pendentes.')
+priority_command.add_argument('priority', type=int)
+priority_command.add_argument('case_ids', type=int, nargs='+')
+export_command = commands.add_parser('export', help='Exporta os resultados concluídos para um arquivo JSON.')
+export_command.add_argument('output_file')
+args = parser.parse_args()
+
+with open('./configs/system_configs.json', 'r') as f:
+    sys_configs = json.load(f)
+
+with open('./configs/process_configs.json', 'r') as f:
+    process_configs = json.load(f)
+
+scheduler = JobScheduler(args.db,sys_configs,process_configs)
+if args.command == 'add':
+    with open(args.cases_file, 'r') as f:
+        cases = json.load(f)
+    try:
+        case_ids = scheduler.add_cases(cases,args.priority)
+        print(f'{len(case_ids)} casos adicionados.')
+    except ValueError as error:
+        print(f'Nenhum caso adicionado: {error}')
+elif args.command == 'run':
+    print(f'{scheduler.run(args.max_cases)} casos calculados.')
+elif args.command == 'status':
+    for status, count in scheduler.status().items():
+        print(f'{status}: {count}')
+elif args.command == 'cancel':
+    print(f'{scheduler.cancel(args.case_ids)} casos cancelados.')
+elif args.command == 'priority':
+    print(f'{scheduler.set_priority(args.case_ids,args.priority)} casos alterados.')
+elif args.command == 'export':
+    with open(args.output_file, 'w') as f:
+        json.dump(scheduler.get_results(), f)
+scheduler.close()
@@ -0,0 +1,26 @@
+import sys
+import json
+from entities.softSensor import SoftSensor, follow_file, read_unix_socket
+
+##Uso: python soft_sensor.py <arquivo_de_medicoes>
+##     python soft_sensor.py --socket <caminho_do_socket>
+
+with open('./configs/system_configs.json', 'r') as f:
+    sys_configs = json.load(f)
+
+with open('./configs/process_configs.json', 'r') as f:
+    process_configs = json.load(f)
+
+with open('input.json', 'r') as f:
+    input = json.load(f)
+
+if len(sys.argv) == 3 and sys.argv[1] == '--socket':
+    stream = read_unix_socket(sys.argv[2])
+elif len(sys.argv) == 2:
+    stream = follow_file(sys.argv[1])
+else:
+    print('Uso: python soft_sensor.py <arquivo_de_medicoes> | --socket <caminho_do_socket>')
+    sys.exit(1)
+
+soft_sensor = SoftSensor(input,sys_configs,process_configs)
+soft_sensor.run(stream)
@@ -1,9 +1,28 @@
+import json
+import os
+import sqlite3
+import tempfile
 import unittest
 import numpy as np
 from entities.connections import Splitter, Mixer
 from entities.chemicalProcess import ChemicalProcess
-from entities.reactor import GasPhaseReactor, ReactionRateConstant
+from entities.reactor import GasPhaseReactor, PlugFlowReactor, ReactionRateConstant, ReactionModel
 from entities.flash import Flash,LiquidVaporEquilibriumConstant
+from entities.simulation import Simulation
+from entities.softSensor import SoftSensor
+from entities.scheduler import JobScheduler
+from entities.flowsheet import Flowsheet
+from entities import kernels
+
+SYS_CONFIGS = {"max_iterations": 1000, "convergence_threshold": 0.001,
+                "rec_stream_initial_guess": 0.0, "rec_compositions_initial_guess": 0.0,
+                "soft_sensor": {"deadband": 0.01, "deadline": 30.0}}
+PROCESS_CONFIGS = {"N_components": 4, "Vr": 1.0,
+                    "Kor": [[0.0117, 0.036738],[0.0135162, 0.02863584]],
+                    "Ea": [[30190, 30190],[30190,30190]],
+                    "reaction_coefficients": [[-2,1,1,0],[-1,-1,1,1]],
+                    "elv_coefficients": [[5.658375,5307.813,379.456,714.2],[6.194778,7947.647,317.1246,557.0],
+                                        [5.602657,418.1773,474.214,190.8],[-14.7697,-15484.2,122.524,0.0000037852]]}
 
 class TestConnections(unittest.TestCase):
 
@@ -94,6 +113,390 @@ class TestChemicalProcess(unittest.TestCase):
 
         self.assertAlmostEqual(chemical_process.F[6],0, places=3)
         
+class TestSoftSensor(unittest.TestCase):
+
+    def setUp(self):
+        self.input = {"Fo": 100.0, "Xoa": 1.0, "Xob": 0.0, "Xoc": 0.0, "Xod": 0.0,
+                        "Tr": 973, "Pr": 10, "Tf": 473, "Pf": 10, "Cs": 0.5}
+        self.sys_configs = dict(SYS_CONFIGS)
+        self.process_configs = PROCESS_CONFIGS
+
+    def test_tick_and_deadband(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        estimate = soft_sensor.process_tick({"Fo": 100.0, "Tr": 973})
+        self.assertFalse(estimate['stale'])
+        self.assertFalse(estimate['skipped'])
+        self.assertAlmostEqual(estimate['F2']['F'], 163.158, places=1)
+        self.assertAlmostEqual(estimate['F6']['F'], 63.217, places=1)
+        estimate = soft_sensor.process_tick({"Fo": 100.5, "Tr": 973})
+        self.assertTrue(estimate['skipped'])
+        self.assertAlmostEqual(estimate['F2']['F'], 163.158, places=1)
+        estimate = soft_sensor.process_tick({"Fo": 110.0, "Tr": 973})
+        self.assertFalse(estimate['skipped'])
+        self.assertFalse(estimate['stale'])
+        self.assertGreater(estimate['F2']['F'], 163.158)
+
+    def test_missed_deadline_is_stale(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        soft_sensor.process_tick({"Fo": 100.0})
+        previous_F2 = soft_sensor.get_estimate()['F2']['F']
+        converged_guesses = soft_sensor.simulation.get_initial_guesses()
+        soft_sensor.deadline = 0.0
+        estimate = soft_sensor.process_tick({"Fo": 150.0})
+        self.assertTrue(estimate['stale'])
+        self.assertEqual(estimate['F2']['F'], previous_F2)
+        self.assertTrue(soft_sensor.simulation.deadline_missed)
+        self.assertEqual(soft_sensor.simulation.get_initial_guesses(), converged_guesses)
+        soft_sensor.deadline = 30.0
+        warm_guesses = []
+        iterate_process = soft_sensor.simulation.iterate_process
+        def recording_iterate_process(deadline=None):
+            warm_guesses.append(soft_sensor.simulation.reactor_initial_guess)
+            return iterate_process(deadline)
+        soft_sensor.simulation.iterate_process = recording_iterate_process
+        estimate = soft_sensor.process_tick({"Fo": 102.0})
+        self.assertFalse(estimate['stale'])
+        self.assertEqual(warm_guesses, [converged_guesses[2]])
+        estimate = soft_sensor.process_tick({"Fo": 102.0})
+        self.assertTrue(estimate['skipped'])
+        self.assertFalse(estimate['stale'])
+
+    def test_warm_start_failure_falls_back_to_default_guesses(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        self.assertAlmostEqual(soft_sensor.process_tick({})['F2']['F'], 163.158, delta=0.5)
+        self.assertAlmostEqual(soft_sensor.last_state.B, 0.775, places=2)
+        estimate = soft_sensor.process_tick({"Tf": 300, "Pf": 3})
+        self.assertFalse(estimate['stale'])
+        self.assertAlmostEqual(soft_sensor.last_state.B, 0.436, places=2)
+        self.assertAlmostEqual(estimate['F2']['F'], 127.853, delta=0.5)
+
+    def test_solver_error_is_published_as_stale(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        previous_F2 = soft_sensor.process_tick({})['F2']['F']
+        def failing_calculation(deadline=None):
+            raise RuntimeError("Failed to converge")
+        soft_sensor.simulation.calculate_results = failing_calculation
+        estimate = soft_sensor.process_tick({"Tf": 300, "Pf": 3})
+        self.assertTrue(estimate['stale'])
+        self.assertEqual(estimate['F2']['F'], previous_F2)
+
+    def test_invalid_measurements(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        estimate = soft_sensor.process_tick({"Fo": 500.0})
+        self.assertTrue(estimate['stale'])
+        self.assertIsNone(estimate['F2'])
+        self.assertEqual(estimate['warnings'], ["Fo inserted out of allowed range."])
+
+    def test_null_and_nan_measurements_are_rejected(self):
+        soft_sensor = SoftSensor(self.input,self.sys_configs,self.process_configs)
+        estimates = []
+        soft_sensor.run(['{"Fo": 100.0}', '{"Fo": null}', '{"Tr": NaN}', '{"Fo": 100.0}'], publish=estimates.append)
+        self.assertEqual(len(estimates), 4)
+        self.assertTrue(estimates[1]['stale'])
+        self.assertFalse(estimates[1]['skipped'])
+        self.assertEqual(estimates[1]['warnings'], ["Fo measurement is not a finite number."])
+        self.assertEqual(estimates[1]['F2'], estimates[0]['F2'])
+        self.assertTrue(estimates[2]['stale'])
+        self.assertFalse(estimates[2]['skipped'])
+        self.assertEqual(estimates[2]['warnings'], ["Tr measurement is not a finite number."])
+        self.assertTrue(estimates[3]['skipped'])
+        self.assertFalse(estimates[3]['stale'])
+
+class TestJobScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), "campaign.db")
+        base_input = {"Fo": 100.0, "Xoa": 1.0, "Xob": 0.0, "Xoc": 0.0, "Xod": 0.0,
+                        "Tr": 973, "Pr": 10, "Tf": 473, "Pf": 10, "Cs": 0.5}
+        self.inputs = [dict(base_input, Fo=Fo) for Fo in [180.0, 100.0, 170.0, 110.0]]
+
+    def test_resume_and_neighbor_order(self):
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        case_ids = scheduler.add_cases(self.inputs)
+        self.assertEqual(scheduler.run(max_cases=2), 2)
+        self.assertEqual([case['input']['Fo'] for case in scheduler.get_results()], [180.0, 170.0])
+        scheduler.close()
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertEqual(scheduler.status(), {'done': 2, 'pending': 2})
+        scheduler.run()
+        self.assertEqual(scheduler.status(), {'done': 4})
+        results = scheduler.get_results()
+        self.assertEqual([case['id'] for case in results], case_ids)
+        self.assertAlmostEqual(results[1]['result']['F'][2], 163.158, delta=0.5)
+        scheduler.close()
+
+    def test_warm_start_failure_falls_back_to_default_guesses(self):
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        scheduler.add_cases([self.inputs[1], dict(self.inputs[1], Tf=300, Pf=3)])
+        scheduler.run()
+        self.assertEqual(scheduler.status(), {'done': 2})
+        self.assertAlmostEqual(scheduler.get_results()[1]['result']['B'], 0.436, places=2)
+        scheduler.close()
+
+    def test_invalid_cases(self):
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        incomplete_input = dict(self.inputs[0])
+        del incomplete_input['Cs']
+        self.assertRaises(ValueError, scheduler.add_cases, [self.inputs[0], incomplete_input])
+        self.assertRaises(ValueError, scheduler.add_cases, [dict(self.inputs[0], Tr="973")])
+        self.assertEqual(scheduler.status(), {})
+        case_ids = scheduler.add_cases(self.inputs[:2])
+        scheduler.process_configs = {key: value for key, value in PROCESS_CONFIGS.items() if key != 'Vr'}
+        scheduler.run()
+        self.assertEqual(scheduler.status(), {'failed': 2})
+        scheduler.process_configs = PROCESS_CONFIGS
+        scheduler.connection.execute("UPDATE cases SET status = 'pending' WHERE id = ?", (case_ids[0],))
+        scheduler.run()
+        self.assertEqual(scheduler.status(), {'done': 1, 'failed': 1})
+        scheduler.close()
+
+    def test_cancel_and_priority(self):
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        case_ids = scheduler.add_cases(self.inputs)
+        self.assertEqual(scheduler.cancel([case_ids[0]]), 1)
+        self.assertEqual(scheduler.set_priority([case_ids[3]],5), 1)
+        scheduler.run(max_cases=1)
+        self.assertEqual(scheduler.get_results()[0]['id'], case_ids[3])
+        self.assertEqual(scheduler.cancel([case_ids[3]]), 0)
+        self.assertEqual(scheduler.status(), {'cancelled': 1, 'done': 1, 'pending': 2})
+        scheduler.close()
+
+    def test_nearest_case_in_campaign_without_coordinate_columns(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("""CREATE TABLE cases (id INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER NOT NULL DEFAULT 0,
+                              status TEXT NOT NULL DEFAULT 'pending', input TEXT NOT NULL, result TEXT,
+                              created REAL NOT NULL, finished REAL)""")
+        for Fo, status in [(180.0, 'done'), (100.0, 'done'), (170.0, 'pending'), (110.0, 'pending')]:
+            connection.execute("INSERT INTO cases (status, input, result, created) VALUES (?, ?, ?, 0)",
+                               (status, json.dumps(dict(self.inputs[0], Fo=Fo)), json.dumps({'Fo': Fo})))
+        connection.commit()
+        connection.close()
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertEqual(scheduler.get_warm_start(dict(self.inputs[0], Fo=150.0)), {'Fo': 180.0})
+        self.assertEqual(scheduler.get_warm_start(dict(self.inputs[0], Fo=120.0)), {'Fo': 100.0})
+        scheduler.last_input = dict(self.inputs[0], Fo=100.0)
+        self.assertEqual(scheduler.next_case(), (4, dict(self.inputs[0], Fo=110.0)))
+        scheduler.add_cases([dict(self.inputs[0], Fo=101.0)])
+        self.assertEqual(scheduler.next_case(), (5, dict(self.inputs[0], Fo=101.0)))
+        scheduler.close()
+
+    def test_changes_from_another_connection_reach_the_queue(self):
+        scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        case_ids = scheduler.add_cases(self.inputs)
+        scheduler.run(max_cases=1)
+        self.assertEqual(scheduler.next_case()[0], case_ids[2])
+        other_scheduler = JobScheduler(self.db_path,SYS_CONFIGS,PROCESS_CONFIGS)
+        other_scheduler.cancel([case_ids[2]])
+        other_scheduler.add_cases([dict(self.inputs[0], Fo=60.0)], priority=1)
+        other_scheduler.close()
+        self.assertEqual(scheduler.next_case(), (case_ids[3]+1, dict(self.inputs[0], Fo=60.0)))
+        scheduler.run()
+        self.assertEqual([case['input']['Fo'] for case in scheduler.get_results()], [180.0, 100.0, 110.0, 60.0])
+        self.assertEqual(scheduler.status(), {'cancelled': 1, 'done': 4})
+        scheduler.close()
+
+class TestFlowsheet(unittest.TestCase):
+
+    def setUp(self):
+        self.input = {"Fo": 100.0, "Xoa": 1.0, "Xob": 0.0, "Xoc": 0.0, "Xod": 0.0,
+                        "Tr": 973, "Pr": 10, "Tf": 473, "Pf": 10, "Cs": 0.5}
+        self.units = {"mixer": {"type": "Mixer"},
+                        "reactor": {"type": "GasPhaseReactor", "T": "Tr", "P": "Pr"},
+                        "flash": {"type": "Flash", "T": "Tf", "P": "Pf"},
+                        "splitter": {"type": "Splitter", "Cs": "Cs"}}
+        self.streams = {"F0": {"to": "mixer", "F": "Fo", "W": ["Xoa","Xob","Xoc","Xod"]},
+                        "F1": {"from": "mixer", "to": "reactor"},
+                        "F2": {"from": "reactor", "to": "flash"},
+                        "F3": {"from": "flash.liquid"},
+                        "F4": {"from": "flash.vapor", "to": "splitter"},
+                        "F5": {"from": "splitter.purge"},
+                        "F6": {"from": "splitter.recycle", "to": "mixer"}}
+
+    def test_single_recycle(self):
+        flowsheet = Flowsheet({"units": self.units, "streams": self.streams},SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertEqual(flowsheet.components, [["mixer","reactor","flash","splitter"]])
+        self.assertEqual(list(flowsheet.tear_streams.values()), [["F6"]])
+        self.assertTrue(flowsheet.evaluate(self.input))
+        self.assertAlmostEqual(flowsheet.F["F2"], 163.158, delta=0.5)
+        self.assertAlmostEqual(flowsheet.F["F6"], 63.217, delta=0.5)
+        self.assertAlmostEqual(flowsheet.F["F3"]+flowsheet.F["F5"], 100, delta=0.5)
+
+    def test_default_flowsheet_config(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs", "flowsheet_configs.json")) as f:
+            flowsheet = Flowsheet(json.load(f),SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertTrue(flowsheet.evaluate(dict(self.input, Cs=0.0)))
+        output_text = flowsheet.format_output()
+        self.assertIn("F2: F = 100.0, X = [0.429, 0.153, 0.33, 0.088]", output_text)
+        self.assertIn("F3: F = 35.257", output_text)
+
+    def test_invalid_flowsheets(self):
+        units = dict(self.units, pump={"type": "Pump"})
+        with self.assertRaisesRegex(ValueError, "Unknown unit type Pump"):
+            Flowsheet({"units": units, "streams": self.streams},SYS_CONFIGS,PROCESS_CONFIGS)
+        streams = dict(self.streams, F7={"to": "reactor", "F": 50.0, "W": [1,0,0,0]})
+        with self.assertRaisesRegex(ValueError, "exactly one inlet"):
+            Flowsheet({"units": self.units, "streams": streams},SYS_CONFIGS,PROCESS_CONFIGS)
+
+    def test_two_recycles_and_independent_branch(self):
+        units = dict(self.units, liquid_splitter={"type": "Splitter", "Cs": 0.3},
+                        reactor_b={"type": "GasPhaseReactor", "T": 1000, "P": 12})
+        streams = dict(self.streams, F3={"from": "flash.liquid", "to": "liquid_splitter"},
+                        F7={"from": "liquid_splitter.recycle", "to": "mixer"},
+                        F8={"from": "liquid_splitter.purge"},
+                        F9={"to": "reactor_b", "F": 80.0, "W": [1,0,0,0]},
+                        F10={"from": "reactor_b"})
+        flowsheet = Flowsheet({"units": units, "streams": streams},SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertEqual(flowsheet.components, [["reactor_b"],["mixer","reactor","flash","splitter","liquid_splitter"]])
+        self.assertEqual(list(flowsheet.tear_streams.values()), [["F1"]])
+        self.assertTrue(flowsheet.evaluate(self.input))
+        self.assertAlmostEqual(flowsheet.F["F5"]+flowsheet.F["F8"], 100, delta=0.5)
+        self.assertAlmostEqual(flowsheet.F["F10"], 80, places=3)
+
+    def test_independent_recycles_run_in_separate_workers(self):
+        units = dict(self.units, **{f"{unit_name}_b": dict(unit) for unit_name, unit in self.units.items()})
+        streams = dict(self.streams, G0={"to": "mixer_b", "F": 80.0, "W": [0.9,0.1,0,0]},
+                        G1={"from": "mixer_b", "to": "reactor_b"},
+                        G2={"from": "reactor_b", "to": "flash_b"},
+                        G3={"from": "flash_b.liquid"},
+                        G4={"from": "flash_b.vapor", "to": "splitter_b"},
+                        G5={"from": "splitter_b.purge"},
+                        G6={"from": "splitter_b.recycle", "to": "mixer_b"})
+        parallel = Flowsheet({"units": units, "streams": streams, "max_workers": 2},SYS_CONFIGS,PROCESS_CONFIGS)
+        sequential = Flowsheet({"units": units, "streams": streams, "max_workers": 1},SYS_CONFIGS,PROCESS_CONFIGS)
+        self.assertEqual([sorted(components) for components in parallel.levels], [[["mixer","reactor","flash","splitter"],["mixer_b","reactor_b","flash_b","splitter_b"]]])
+        self.assertTrue(parallel.evaluate(self.input))
+        self.assertTrue(sequential.evaluate(self.input))
+        workers = list(parallel.component_workers.values())
+        self.assertEqual(len(set(workers)), 2)
+        self.assertNotIn(os.getpid(), workers)
+        self.assertEqual(set(sequential.component_workers.values()), {os.getpid()})
+        self.assertEqual(parallel.F, sequential.F)
+        self.assertEqual(parallel.W, sequential.W)
+        self.assertEqual(parallel.reactor_guesses, sequential.reactor_guesses)
+        self.assertEqual(parallel.flash_guesses, sequential.flash_guesses)
+        self.assertAlmostEqual(parallel.F["F2"], 163.158, delta=0.5)
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        self.Kr = [[5.16928270*10**(-9), 1.62315477*10**(-8)],[5.97171444*10**(-9), 1.26518592*10**(-8)]]
+        self.reaction_coefficients = [[-2,1,1,0],[-1,-1,1,1]]
+        self.W = [0.41, 0.16, 0.34, 0.09]
+        self.P = 12*10.0**(5)
+        self.backends = [kernels.NumpyKernels]
+        if kernels.numba is not None:
+            self.backends.append(kernels.NumbaKernels)
+
+    def tearDown(self):
+        kernels.set_backend('auto')
+
+    def test_reaction_rates_parity(self):
+        expected = [ReactionModel(self.Kr,self.reaction_coefficients,self.P,i,self.W).get_global_reaction_rate() for i in range(4)]
+        for backend in self.backends:
+            rates = backend.reaction_rates(np.array(self.W),self.P,np.array(self.Kr),np.array(self.reaction_coefficients,dtype=float))
+            for i in range(len(expected)):
+                self.assertAlmostEqual(rates[i]/expected[i], 1.0, places=10)
+
+    def test_reactor_residual_parity(self):
+        x = np.array(self.W+[99.0])
+        rates = [ReactionModel(self.Kr,self.reaction_coefficients,self.P,i,self.W).get_global_reaction_rate() for i in range(4)]
+        Win = [1,0,0,0]
+        expected = [100*Win[i]/99.0+rates[i]/99.0-self.W[i] for i in range(4)]+[100-99.0+sum(rates)]
+        for backend in self.backends:
+            f = backend.reactor_residual(x,100,np.array(Win,dtype=float),1,self.P,np.array(self.Kr),np.array(self.reaction_coefficients,dtype=float))
+            for i in range(len(expected)):
+                self.assertAlmostEqual(f[i], expected[i], places=12)
+
+    def test_rachford_rice_parity(self):
+        Z = [0.42206264789235637, 0.14409646369486045, 0.3078262669389916, 0.08382562981951494]
+        K = [5.4e-08, 1.4e-06, 79.7, 0.0063]
+        for beta in [0.0, 0.3, 0.6]:
+            expected = sum(Z[i]*K[i]/(1+beta*(K[i]-1)) for i in range(4))-1
+            for backend in self.backends:
+                self.assertAlmostEqual(backend.rachford_rice_residual(beta,np.array(Z),np.array(K)), expected, places=12)
+
+    def test_backend_selection(self):
+        self.assertEqual(kernels.set_backend('numpy'), 'numpy')
+        self.assertIs(kernels.get_backend(), kernels.NumpyKernels)
+        self.assertEqual(kernels.set_backend('auto'), 'numpy' if kernels.numba is None else 'numba')
+        self.assertRaises(ValueError, kernels.set_backend, 'fortran')
+
+    def test_reactor_with_each_backend(self):
+        for backend in self.backends:
+            kernels.set_backend(backend.name)
+            reactor = GasPhaseReactor(100,[1,0,0,0],1,self.Kr,self.reaction_coefficients,self.P,1038.262085)
+            reactor.evaluate((0.40,0.2,0.3,0.1,100))
+            self.assertAlmostEqual(reactor.Fout,100)
+            expected_wi_result = [0.41582426620362845, 0.15708837073377083, 0.3370876989529908, 0.08999966410960998]
+            for i in range(len(expected_wi_result)):
+                self.assertAlmostEqual(reactor.Wout[i],expected_wi_result[i], places=3)
+
+class TestPlugFlowReactor(unittest.TestCase):
+
+    def setUp(self):
+        self.Kr = [[5.16928270*10**(-9), 1.62315477*10**(-8)],[5.97171444*10**(-9), 1.26518592*10**(-8)]]
+        self.reaction_coefficients = [[-2,1,1,0],[-1,-1,1,1]]
+        self.P = 12*10.0**(5)
+        self.T = 1038.262085
+
+    def test_matches_cstrs_in_series(self):
+        reactor = PlugFlowReactor(100,[1,0,0,0],0.002,self.Kr,self.reaction_coefficients,self.P,self.T)
+        reactor.evaluate()
+        Fout, Wout = 100, [1,0,0,0]
+        for i in range(400):
+            cstr = GasPhaseReactor(Fout,Wout,0.002/400,self.Kr,self.reaction_coefficients,self.P,self.T)
+            cstr.evaluate(tuple(Wout)+(Fout,))
+            Fout, Wout = cstr.Fout, list(cstr.Wout)
+        self.assertAlmostEqual(reactor.Fout, Fout, places=6)
+        for i in range(len(Wout)):
+            self.assertAlmostEqual(reactor.Wout[i], Wout[i], places=3)
+
+    def test_batch_and_jacobian(self):
+        Fins = [100, 80, 120]
+        Wins = [[1,0,0,0],[0.7,0.1,0.1,0.1],[0.5,0.5,0,0]]
+        reactor = PlugFlowReactor(Fins[0],Wins[0],0.002,self.Kr,self.reaction_coefficients,self.P,self.T)
+        Fouts, Wouts = reactor.evaluate_batch(Fins,Wins)
+        for Fin, Win, Fout, Wout in zip(Fins,Wins,Fouts,Wouts):
+            single = PlugFlowReactor(Fin,Win,0.002,self.Kr,self.reaction_coefficients,self.P,self.T)
+            single.evaluate()
+            self.assertAlmostEqual(single.Fout, Fout, places=6)
+            for i in range(len(Wout)):
+                self.assertAlmostEqual(single.Wout[i], Wout[i], places=6)
+        y = np.array([40.0, 20.0, 25.0, 15.0, 60.0, 5.0, 10.0, 5.0])
+        jacobian = reactor.formulate_jacobian(0.0,y).toarray()
+        for m in range(len(y)):
+            dy = np.zeros(len(y))
+            dy[m] = 1e-4
+            finite_difference = (reactor.formulate_equations(0.0,y+dy)-reactor.formulate_equations(0.0,y-dy))/2e-4
+            for i in range(len(y)):
+                self.assertAlmostEqual(jacobian[i,m], finite_difference[i], delta=1e-6*np.max(np.abs(jacobian)))
+
+    def test_chemical_process_with_plug_flow_reactor(self):
+        elv_coefficients=[[5.658375,5307.813,379.456,714.2],[6.194778,7947.647,317.1246,557.0],
+                            [5.602657,418.1773,474.214,190.8],[-14.7697,-15484.2,122.524,0.0000037852]]
+        chemical_process = ChemicalProcess(0,[0,0,0,0],reactor_type='PlugFlowReactor')
+        chemical_process.evaluate(100,[1,0,0,0],1,10**6,973,[[-2,1,1,0],[-1,-1,1,1]],
+                            [[0.0117, 0.036738],[0.0135162, 0.02863584]],[[30190, 30190],[30190,30190]],
+                            10**6,473,elv_coefficients,0)
+        self.assertAlmostEqual(chemical_process.F[2],100, places=3)
+        self.assertAlmostEqual(sum(chemical_process.W[2]),1, places=6)
+        self.assertAlmostEqual(chemical_process.F[3]+chemical_process.F[4],100, places=3)
+
+    def test_recycle_with_plug_flow_reactor(self):
+        input = {"Fo": 100.0, "Xoa": 1.0, "Xob": 0.0, "Xoc": 0.0, "Xod": 0.0,
+                    "Tr": 973, "Pr": 10, "Tf": 473, "Pf": 10, "Cs": 0.5}
+        plug_flow = Simulation(input,SYS_CONFIGS,dict(PROCESS_CONFIGS, reactor_type='PlugFlowReactor')).calculate_results()
+        stirred_tank = Simulation(input,SYS_CONFIGS,PROCESS_CONFIGS).calculate_results()
+        expected_F_result = [100, 162.736, 162.736, 37.146, 125.59, 62.795, 62.795]
+        for i in range(len(expected_F_result)):
+            self.assertAlmostEqual(plug_flow.F[i],expected_F_result[i], places=2)
+        expected_W2_result = [0.399, 0.118, 0.431, 0.052]
+        expected_W6_result = [0.43, 0.012, 0.558, 0.0]
+        for i in range(len(expected_W2_result)):
+            self.assertAlmostEqual(plug_flow.W[2][i],expected_W2_result[i], places=3)
+            self.assertAlmostEqual(plug_flow.W[6][i],expected_W6_result[i], places=3)
+        self.assertAlmostEqual(stirred_tank.W[2][0],0.419, places=3)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file